@@ -0,0 +1,77 @@
+from multiprocessing import Pool
+
+from ParseTable import CompiledTable, table_cache_path
+
+# Per-process parser/translator, set up once by init_worker; worker_error says why it is missing
+worker_runner = None
+worker_error = None
+
+
+def init_worker(runner_class, grammar, settings, cache_path, fingerprint):
+    """Pool initializer: rebuild the grammar and settings, memory-map the shared compiled table
+
+    settings comes from runner.worker_settings() and is applied on top of the
+    freshly constructed runner, before the table is installed. A table that
+    does not load is not raised here: a failing initializer makes the Pool
+    respawn workers forever, so the error is kept for the first task to raise.
+    """
+    global worker_runner, worker_error
+    table = CompiledTable.load(cache_path, fingerprint)
+    if table is None:
+        worker_error = f"compiled table {cache_path} is missing or does not match the grammar"
+        return
+    worker_runner = runner_class()
+    worker_runner.set_grammar(*grammar)
+    for name, value in settings.items():
+        setattr(worker_runner, name, value)
+    worker_runner.set_compiled_table(table)
+
+
+def current_runner():
+    if worker_runner is None:
+        raise RuntimeError(worker_error or "worker used outside of a run_batch pool")
+    return worker_runner
+
+
+def parse_one(text):
+    """Silent accept/reject of one input in a worker"""
+    return current_runner().parse_input(text)
+
+
+def translate_one(text):
+    """Three-address code of one input in a worker, None on a syntax error"""
+    return current_runner().translate_input(text)
+
+
+def parse_indexed(item):
+    index, text = item
+    return index, parse_one(text)
+
+
+def translate_indexed(item):
+    index, text = item
+    return index, translate_one(text)
+
+
+def run_batch(runner, task, indexed_task, inputs, processes=None, chunksize=64, ordered=True, cache_dir=None):
+    """Fan inputs out to a process pool that shares one memory-mapped table file
+
+    The compiled table of `runner` is written to the table cache if it is not
+    there yet; every worker maps that file once in its initializer, so no table
+    is pickled per task. Yields results in input order, or (index, result) pairs
+    in completion order when ordered is False.
+    """
+    fingerprint = runner.table_fingerprint()
+    cache_path = table_cache_path(fingerprint, cache_dir)
+    if CompiledTable.load(cache_path, fingerprint) is None:  # missing, truncated, stale or of an older format
+        runner.save_cached_table(cache_dir)
+        if CompiledTable.load(cache_path, fingerprint) is None:
+            raise RuntimeError(f"compiled table {cache_path} cannot be read back after saving it")
+
+    grammar = (runner.N, runner.T, runner.S, runner.P, runner.precedence, runner.token_patterns)
+    with Pool(processes, initializer=init_worker,
+              initargs=(type(runner), grammar, runner.worker_settings(), cache_path, fingerprint)) as pool:
+        if ordered:
+            yield from pool.imap(task, inputs, chunksize)
+        else:
+            yield from pool.imap_unordered(indexed_task, enumerate(inputs), chunksize)
@@ -0,0 +1,179 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+from LR1 import LR1Parser
+from Translator import LR1Translator
+
+GRAMMAR_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gramatica_productie.txt')
+OPERATORS = ['+', '-', '*', '/', '%', '^', '&', '|', '<', '>', '=', '!', '?', '~', ':', ';']
+
+
+def level_operators(levels):
+    """One binary operator per precedence level"""
+    return OPERATORS[:levels] + [f'#{i}' for i in range(len(OPERATORS), levels)]
+
+
+def expression_grammar(levels):
+    """(N, T, S, P) of a left-associative expression grammar with `levels` precedence levels
+
+    E0 -> E0 op0 E1 | E1, ..., E<levels> -> ( E0 ) | a
+    """
+    ops = level_operators(levels)
+    N = [f'E{i}' for i in range(levels + 1)]
+    T = ['a'] + ops + ['(', ')']
+    P = {}
+    for i, op in enumerate(ops):
+        P[len(P) + 1] = (N[i], (N[i], op, N[i + 1]))
+        P[len(P) + 1] = (N[i], (N[i + 1],))
+    P[len(P) + 1] = (N[-1], ('(', N[0], ')'))
+    P[len(P) + 1] = (N[-1], ('a',))
+    return N, T, N[0], P
+
+
+def flat_input(n_tokens, ops):
+    """'a op a op ... a' with about n_tokens tokens, cycling through the operators"""
+    operands = max(1, (n_tokens + 1) // 2)
+    parts = ['a']
+    for i in range(1, operands):
+        parts.append(ops[i % len(ops)])
+        parts.append('a')
+    return ' '.join(parts)
+
+
+def nested_input(n_tokens, ops):
+    """Deeply nested parentheses: ((( ... (a op a) ... ))) with about n_tokens tokens"""
+    depth = max(0, (n_tokens - 3) // 2)
+    return '(' * depth + f'a {ops[0]} a' + ')' * depth
+
+
+def best_time(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None or elapsed < best else best
+    return best
+
+
+def build(runner, repeat):
+    """Time every construction phase of an LR1Parser/LR1Translator, leaving its tables built"""
+    timings = {}
+    timings['first_sets'] = best_time(runner.compute_first_sets, repeat)
+    initial_kernel = ((runner.cores.start[0],), (runner.terminal_bits['$'],))
+    timings['closure_initial'] = best_time(lambda: runner.closure(initial_kernel), repeat)
+    timings['collection'] = best_time(runner.build_canonical_collection, repeat)
+    timings['table'] = best_time(runner.build_parsing_table, repeat)
+    table = runner.compiled_table
+    return {
+        'productions': len(runner.P),
+        'nonterminals': len(runner.N),
+        'terminals': len(runner.T),
+        'construction': runner.construction,
+        'skip_unit_reductions': runner.skip_unit_reductions,
+        'states': table.n_states,
+        'table_bytes': table.nbytes(),
+        'seconds': timings,
+    }
+
+
+def throughput(run, text, n_tokens, repeat):
+    seconds = best_time(lambda: run(text), repeat)
+    return {
+        'tokens': n_tokens,
+        'chars': len(text),
+        'seconds': seconds,
+        'tokens_per_second': n_tokens / seconds if seconds else None,
+    }
+
+
+def token_count(runner, text):
+    return len(runner.lexer.kinds(text)) - 1  # without '$'
+
+
+def bench_runner(name, runner, ops, sizes, repeat, run):
+    result = {'name': name, 'build': build(runner, repeat), 'inputs': []}
+    for shape, generate in (('flat', flat_input), ('nested', nested_input)):
+        for size in sizes:
+            text = generate(size, ops)
+            if not run(text):
+                raise RuntimeError(f"{name}: generated {shape} input of {size} tokens was rejected")
+            entry = throughput(run, text, token_count(runner, text), repeat)
+            entry['shape'] = shape
+            result['inputs'].append(entry)
+    return result
+
+
+def run_benchmarks(levels, sizes, repeat, construction='lr1', skip_unit_reductions=False):
+    results = []
+
+    for n in levels:
+        parser = LR1Parser()
+        parser.set_grammar(*expression_grammar(n))
+        parser.construction = construction
+        parser.skip_unit_reductions = skip_unit_reductions
+        results.append(bench_runner(f'expression-{n}-levels', parser, level_operators(n), sizes, repeat,
+                                    parser.parse_input))
+
+    parser = LR1Parser()
+    parser.load_grammar(GRAMMAR_FILE)
+    parser.construction = construction
+    parser.skip_unit_reductions = skip_unit_reductions
+    results.append(bench_runner('gramatica_productie', parser, ['+', '*'], sizes, repeat, parser.parse_input))
+
+    translator = LR1Translator()
+    translator.construction = construction
+    translator.skip_unit_reductions = skip_unit_reductions
+    results.append(bench_runner('translator', translator, ['+', '-', '*', '/'], sizes, repeat,
+                                lambda text: translator.translate_input(text) is not None))
+
+    return {
+        'meta': {
+            'python': sys.version.split()[0],
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark table generation and parsing throughput")
+    arg_parser.add_argument('--levels', type=int, nargs='+', default=[1, 2, 4, 8, 16],
+                            help="precedence levels of the synthetic expression grammars")
+    arg_parser.add_argument('--max-tokens', type=int, default=10 ** 6,
+                            help="largest generated input, inputs go from 10 tokens up by factors of 10")
+    arg_parser.add_argument('--repeat', type=int, default=3, help="runs per measurement, the best one is kept")
+    arg_parser.add_argument('--construction', choices=['lr1', 'lalr', 'pager'], default='lr1')
+    arg_parser.add_argument('--skip-unit-reductions', action='store_true',
+                            help="bypass unit reductions like E -> T in the compiled tables")
+    arg_parser.add_argument('--quick', action='store_true', help="small grammars and inputs up to 10^4 tokens")
+    arg_parser.add_argument('-o', '--output', help="JSON file to write, default stdout")
+    args = arg_parser.parse_args()
+
+    levels, max_tokens = args.levels, args.max_tokens
+    if args.quick:
+        levels, max_tokens = [1, 2, 4], 10 ** 4
+    sizes = []
+    size = 10
+    while size <= max_tokens:
+        sizes.append(size)
+        size *= 10
+
+    report = run_benchmarks(levels, sizes, args.repeat, args.construction, args.skip_unit_reductions)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,459 @@
+import time
+from collections import deque
+
+from FirstFollow import first_masks, follow_masks, mask_symbols, nullable_nonterminals, string_first, terminal_bits
+from Grammar import load_grammar, production_precedences, resolve_shift_reduce
+from Items import ItemCores, freeze
+from Lexer import TOKEN_PATTERNS, Lexer
+from ParseTable import ACCEPT, ERROR, CompiledTable, action_text, encode_reduce, grammar_fingerprint, table_cache_path
+from Recovery import ErrorRecovery
+from StateMerging import WeakCompatibilityMerger, merge_lr0_cores, prune_unreachable
+from UnitReductions import bypass_unit_reductions, unit_productions
+
+
+class LR1Engine:
+    """Table construction shared by LR1Parser and LR1Translator
+
+    Grammar setup, FIRST/FOLLOW, the canonical/LALR/Pager collection, the
+    ACTION/GOTO table with its conflict policy, the on-disk table cache and
+    error recovery; subclasses add what they run over the compiled table.
+    """
+
+    def __init__(self, N, T, S, P):
+        self.itemsets = []  # Canonical collection of LR(1) itemsets as (core ids, lookahead masks)
+        self.kernels = {}  # Kernel (frozenset of items) -> state index
+        self.transitions = []  # GOTO function recorded during construction
+        self.compiled_table = None  # Integer-encoded ACTION/GOTO table used by parse_input
+        self.lexer = None  # Tokenizer for the terminals of compiled_table
+        self.compress_table = False  # Pack the compiled table with row displacement
+        # Bypass the unit reductions (E -> T, T -> F, F -> a) in the compiled table, see
+        # UnitReductions; traces and stats still report them from table.unit_chains
+        self.skip_unit_reductions = False
+        # 'lr1' (canonical), 'lalr' (merge states with equal LR(0) cores)
+        # or 'pager' (merge only weakly compatible states, keeps LR(1) power)
+        self.construction = 'lr1'
+        self.merge_report = None  # State counts and new conflicts of the last state merge
+        self.tracer = None  # Trace.Tracer observing construction (and LR1Parser.parse_input); None is silent
+        self.stats = None  # Stats.EngineStats counting construction and parse work; None costs nothing
+        self.result_cache = None  # ResultCache.LRUCache of parse/translate results, None to always run
+        self.table_key = None  # fingerprint of compiled_table, part of the result cache keys
+        self.recovery = None  # Recovery.ErrorRecovery of compiled_table, built by the first find_errors
+        self.first_sets = {}  # FIRST sets for non-terminals
+        self.follow_sets = {}  # FOLLOW sets for non-terminals
+        self.terminal_bits = {}  # terminal -> bit of the FIRST/FOLLOW masks
+        self.nullable = set()  # non-terminals deriving epsilon
+        self.first_masks = {}  # non-terminal -> FIRST as a bitmask
+        self.follow_masks = {}  # non-terminal -> FOLLOW as a bitmask
+        self.suffix_first = {}  # (prod_num, dot_pos) -> FIRST of the rest of the right side
+        self.set_grammar(N, T, S, P)
+    
+    def set_grammar(self, N, T, S, P, precedence=None, token_patterns=None):
+        """Replace the grammar G=(N,T,S,P); the tables have to be built or loaded again
+        
+        precedence (a Grammar.Precedence, see Grammar.declare_precedence) resolves
+        shift/reduce conflicts like yacc's %left/%right/%nonassoc, so that an
+        ambiguous E -> E + E | E * E | a grammar can replace the layered E/T/F one.
+        token_patterns maps terminals such as 'id' or 'num' to the regular
+        expressions of their lexemes, in addition to Lexer.TOKEN_PATTERNS.
+        """
+        self.N = list(N)
+        self.T = list(T)
+        self.S = S
+        self.P = dict(P)
+        self.precedence = precedence
+        self.token_patterns = dict(token_patterns) if token_patterns else None
+        self.augmented_P = {0: ("S'", (S,))}
+        self.augmented_P.update(self.P)
+        self.index_productions()
+        
+        self.itemsets = []
+        self.kernels = {}
+        self.transitions = []
+        self.compiled_table = None
+        self.lexer = None
+        self.first_sets = {}
+        self.follow_sets = {}
+        self.terminal_bits = {}
+        self.nullable = set()
+        self.first_masks = {}
+        self.follow_masks = {}
+        self.suffix_first = {}
+    
+    def load_grammar(self, path):
+        """Replace the grammar by the one in a grammar file (see Grammar.parse_grammar)"""
+        self.set_grammar(*load_grammar(path))
+    
+    def index_productions(self):
+        """Pre-split right sides into tuples, number the item cores and index production numbers by left side"""
+        self.rhs = {num: tuple(right) for num, (left, right) in self.augmented_P.items()}
+        self.cores = ItemCores(self.rhs)
+        self.productions_of = {nt: [] for nt in self.N}
+        for num, (left, right) in self.augmented_P.items():
+            if left in self.productions_of:
+                self.productions_of[left].append(num)
+    
+    def compute_first_sets(self):
+        """Compute nullable, FIRST and FOLLOW for all non-terminals
+        
+        Each is one pass over the strongly connected components of the symbol
+        dependency graph (see FirstFollow); sets are bitmasks over T + ['$'].
+        """
+        start = time.perf_counter()
+        self.suffix_first = {}
+        terminals = self.T + ['$']
+        productions = [(left, self.rhs[num]) for num, (left, right) in self.P.items()]
+        self.terminal_bits = terminal_bits(terminals)
+        self.nullable = nullable_nonterminals(productions)
+        self.first_masks = first_masks(self.N, productions, self.terminal_bits, self.nullable)
+        self.follow_masks = follow_masks(self.N, productions, self.terminal_bits, self.nullable,
+                                         self.first_masks, self.S, self.terminal_bits['$'])
+        
+        # Set views for display; 'ε' marks nullable non-terminals
+        self.first_sets = {}
+        self.follow_sets = {}
+        for nt in self.N:
+            self.first_sets[nt] = set(mask_symbols(self.first_masks[nt], terminals))
+            if nt in self.nullable:
+                self.first_sets[nt].add('ε')
+            self.follow_sets[nt] = set(mask_symbols(self.follow_masks[nt], terminals))
+        
+        if self.stats is not None:
+            self.stats.add_time('first_sets', time.perf_counter() - start)
+    
+    def first_of_string(self, string, lookahead):
+        """Compute FIRST of a string of symbols followed by lookahead"""
+        mask, nullable = string_first(string, self.terminal_bits, self.first_masks, self.nullable)
+        result = set(mask_symbols(mask, self.T + ['$']))
+        if nullable:
+            result.add(lookahead)
+        return result
+    
+    def first_of_suffix(self, prod_num, dot_pos):
+        """FIRST of the right side of a production from dot_pos on, memoized per (production, dot)
+        
+        Returns (terminal mask, nullable): the lookaheads of the item are added by the
+        caller only when the whole suffix can derive epsilon.
+        """
+        key = (prod_num, dot_pos)
+        cached = self.suffix_first.get(key)
+        if cached is None:
+            cached = string_first(self.rhs[prod_num][dot_pos:], self.terminal_bits,
+                                  self.first_masks, self.nullable)
+            self.suffix_first[key] = cached
+        return cached
+    
+    def closure(self, kernel):
+        """Compute closure of an LR(1) item set given as (core ids, lookahead masks), see Items"""
+        items = dict(zip(*kernel))  # core id -> lookahead mask
+        worklist = list(items.items())  # (core, lookaheads not expanded yet)
+        cores = self.cores
+        next_symbol, core_prod, core_dot, start = cores.next_symbol, cores.prod, cores.dot, cores.start
+        productions_of = self.productions_of
+        
+        while worklist:
+            core, lookaheads = worklist.pop()
+            
+            # If next symbol is a non-terminal, we need to add its productions
+            # (next_symbol is None when the dot is at the end)
+            new_prods = productions_of.get(next_symbol[core])
+            if not new_prods:
+                continue
+            
+            # Compute lookaheads for the new items from the symbols after next_symbol
+            first, nullable = self.first_of_suffix(core_prod[core], core_dot[core] + 1)
+            if nullable:
+                first |= lookaheads
+            
+            # Add all productions of this non-terminal with the dot at the beginning;
+            # only lookaheads they did not have yet are expanded again
+            for new_prod_num in new_prods:
+                new_core = start[new_prod_num]
+                old = items.get(new_core, 0)
+                new = first & ~old
+                if new:
+                    items[new_core] = old | new
+                    worklist.append((new_core, new))
+        
+        if self.stats is not None:
+            self.stats.closure_calls += 1
+            self.stats.closure_items += len(items)
+        return freeze(items)
+    
+    def goto(self, itemset, symbol):
+        """Compute GOTO for an itemset and symbol"""
+        next_symbol = self.cores.next_symbol
+        
+        # Move the dot past symbol: core c becomes core c + 1
+        new_items = {core + 1: mask for core, mask in zip(*itemset) if next_symbol[core] == symbol}
+        
+        # Return closure of the new items
+        return self.closure(freeze(new_items)) if new_items else ((), ())
+    
+    def itemsets_are_equal(self, set1, set2):
+        """Check if two itemsets are equal"""
+        return set1 == set2
+    
+    def build_canonical_collection(self):
+        #"""Build the canonical collection of LR(1) itemsets"""
+        #print("Building canonical collection of LR(1) itemsets...")
+        start = time.perf_counter()
+        lookups = created = 0  # GOTO kernels looked up and states they created
+        
+        # Start with initial itemset I0; states are registered by their kernel
+        initial_kernel = ((self.cores.start[0],), (self.terminal_bits['$'],))  # (S' -> .E, $)
+        I0 = self.closure(initial_kernel)
+        self.itemsets = [I0]
+        self.kernels = {initial_kernel: 0}  # kernel (core ids, lookahead masks) -> state index
+        self.transitions = [{}]  # transitions[i][symbol] -> GOTO(I_i, symbol)
+        
+        merger = None
+        if self.construction == 'pager':
+            merger = WeakCompatibilityMerger()
+            merger.add(0, initial_kernel)
+        
+        tracer = self.tracer
+        terminals = self.T + ['$']
+        next_symbol = self.cores.next_symbol
+        
+        # Use queue to process itemsets (every state is enqueued once, or again when Pager merging grows it)
+        queue = deque([0])
+        all_symbols = self.T + self.N
+        
+        while queue:
+            current_idx = queue.popleft()
+            self.transitions[current_idx] = {}
+            
+            current_itemset = self.itemsets[current_idx]
+            if tracer is not None:
+                # Report the items of this itemset
+                tracer.state(current_idx, [(self.augmented_P[prod_num][0], self.rhs[prod_num], dot_pos, lookahead)
+                                           for prod_num, dot_pos, lookahead in self.cores.items(current_itemset, terminals)])
+            
+            # Collect the kernel of GOTO(I, X) for every symbol X in one pass; cores stay ascending
+            goto_kernels = {}
+            for core, mask in zip(*current_itemset):
+                symbol = next_symbol[core]
+                if symbol is not None:
+                    kernel_cores, kernel_masks = goto_kernels.setdefault(symbol, ([], []))
+                    kernel_cores.append(core + 1)
+                    kernel_masks.append(mask)
+            
+            # Try all symbols (terminals and non-terminals) in a fixed order
+            for symbol in all_symbols:
+                kernel = goto_kernels.get(symbol)
+                if not kernel:
+                    continue
+                
+                # Check if this itemset already exists; closure only runs for new states
+                kernel = (tuple(kernel[0]), tuple(kernel[1]))
+                found_idx = self.kernels.get(kernel)
+                lookups += 1
+                
+                if found_idx is None and merger is not None:
+                    # Pager: reuse a weakly compatible state, reprocessing it if its lookaheads grew
+                    found_idx, grown_kernel = merger.find(kernel)
+                    if grown_kernel is not None:
+                        self.kernels[grown_kernel] = found_idx
+                        self.itemsets[found_idx] = self.closure(grown_kernel)
+                        queue.append(found_idx)
+                    if found_idx is not None:
+                        self.kernels[kernel] = found_idx
+                
+                if found_idx is None:
+                    # New itemset
+                    created += 1
+                    found_idx = len(self.itemsets)
+                    self.kernels[kernel] = found_idx
+                    self.itemsets.append(self.closure(kernel))
+                    self.transitions.append({})
+                    queue.append(found_idx)
+                    if merger is not None:
+                        merger.add(found_idx, kernel)
+                    #print(f"    I{current_idx} --{symbol}--> I{found_idx} (NEW)")
+                # else:
+                #     print(f"    I{current_idx} --{symbol}--> I{found_idx} (EXISTING)")
+                
+                self.transitions[current_idx][symbol] = found_idx
+        
+        if merger is not None:
+            # States whose kernels were merged away can be left unreachable
+            generated = len(self.itemsets)
+            self.itemsets, self.transitions, self.kernels = prune_unreachable(
+                self.itemsets, self.transitions, self.kernels)
+            self.merge_report = {
+                'generated_states': generated,
+                'states': len(self.itemsets),
+                'merges': merger.merges,
+                'new_conflicts': [],
+            }
+        
+        if tracer is not None:
+            tracer.collection_done(len(self.itemsets))
+            if merger is not None:
+                tracer.merge(self.merge_report)
+        
+        if self.construction == 'lalr':
+            self.merge_lalr_states()
+        
+        if self.stats is not None:
+            self.stats.goto_lookups += lookups
+            self.stats.goto_hits += lookups - created
+            self.stats.states_created += created + 1  # with I0
+            self.stats.add_time('collection', time.perf_counter() - start)
+    
+    def merge_lalr_states(self):
+        """Turn the canonical LR(1) collection into the LALR(1) one by merging equal LR(0) cores"""
+        lr1_states = len(self.itemsets)
+        self.itemsets, self.transitions, merged_of, new_conflicts = merge_lr0_cores(
+            self.itemsets, self.transitions, self.cores, self.T + ['$'])
+        self.kernels = {kernel: merged_of[i] for kernel, i in self.kernels.items()}
+        self.merge_report = {
+            'lr1_states': lr1_states,
+            'states': len(self.itemsets),
+            'new_conflicts': new_conflicts,
+        }
+        
+        if self.tracer is not None:
+            self.tracer.merge(self.merge_report)
+    
+    def build_parsing_table(self):
+        """Build LR(1) parsing table from canonical collection"""
+        start = time.perf_counter()
+        conflicts = 0
+        tracer = self.tracer
+        if tracer is not None:
+            tracer.table_start()
+        terminals = self.T + ['$']
+        core_next, core_prod = self.cores.next_symbol, self.cores.prod
+        precedence = self.precedence
+        if precedence is not None:
+            rule_precedence = production_precedences(precedence, self.rhs, set(self.T))
+        nonassoc_errors = set()  # (state, terminal) entries a %nonassoc made errors
+        
+        terminal_ids = {t: i for i, t in enumerate(terminals)}
+        nonterminal_ids = {nt: i for i, nt in enumerate(self.N)}
+        prod_nums = list(self.augmented_P)
+        prod_ids = {num: i for i, num in enumerate(prod_nums)}
+        action_rows = []  # state -> {terminal id: encoded action}, see ParseTable
+        goto_rows = []  # state -> {non-terminal id: state}
+        
+        # Fill the table using standard LR(1) algorithm
+        for i, itemset in enumerate(self.itemsets):
+            action_row = {}
+            goto_row = {}
+            action_rows.append(action_row)
+            goto_rows.append(goto_row)
+            
+            # Case 1: shift or goto, read from the transitions recorded by build_canonical_collection
+            for next_symbol, goto_index in self.transitions[i].items():
+                if next_symbol in terminal_ids:  # Terminal - shift action
+                    action_row[terminal_ids[next_symbol]] = goto_index
+                    if tracer is not None:
+                        tracer.table_entry(i, next_symbol, 'action', f's{goto_index}')
+                else:  # Non-terminal - goto action
+                    goto_row[nonterminal_ids[next_symbol]] = goto_index
+                    if tracer is not None:
+                        tracer.table_entry(i, next_symbol, 'goto', goto_index)
+            
+            # Case 2: Dot is at the end (reduce or accept), once per lookahead of the core
+            for core, mask in zip(*itemset):
+                if core_next[core] is not None:
+                    continue
+                prod_num = core_prod[core]
+                action = encode_reduce(prod_ids[prod_num])
+                
+                for lookahead in mask_symbols(mask, terminals):
+                    terminal_id = terminal_ids[lookahead]
+                    if prod_num == 0 and lookahead == '$':  # S' -> E.
+                        action_row[terminal_id] = ACCEPT
+                        if tracer is not None:
+                            tracer.table_entry(i, lookahead, 'action', 'acc')
+                        continue
+                    if (i, terminal_id) in nonassoc_errors:
+                        continue
+                    
+                    # Reduce action
+                    current_action = action_row.get(terminal_id, ERROR)
+                    if precedence is not None and current_action > 0:
+                        winner = resolve_shift_reduce(rule_precedence.get(prod_num),
+                                                      precedence.levels.get(lookahead))
+                        if winner is not None:
+                            if tracer is not None:
+                                tracer.resolved(i, lookahead, f's{current_action}', f'r{prod_num}', winner)
+                            if winner == 'reduce':
+                                action_row[terminal_id] = action
+                            elif winner == 'error':
+                                del action_row[terminal_id]
+                                nonassoc_errors.add((i, terminal_id))
+                            continue
+                    if current_action and current_action != action:
+                        # Keep the first action, so a shift wins over a reduce like in yacc
+                        conflicts += 1
+                        if tracer is not None:
+                            tracer.conflict(i, lookahead, action_text(current_action, prod_nums), f'r{prod_num}')
+                    else:
+                        action_row[terminal_id] = action
+                        if tracer is not None:
+                            tracer.table_entry(i, lookahead, 'action', f'r{prod_num}', self.P[prod_num])
+        
+        table = CompiledTable.from_rows(self, action_rows, goto_rows, self.compress_table)
+        if self.skip_unit_reductions:
+            table = bypass_unit_reductions(table, self.bypassed_unit_productions(table))
+        self.set_compiled_table(table)
+        
+        if self.stats is not None:
+            self.stats.conflicts += conflicts
+            self.stats.add_time('table', time.perf_counter() - start)
+    
+    def bypassed_unit_productions(self, table):
+        """Dense ids of the unit productions skip_unit_reductions bypasses in table"""
+        return unit_productions(table)
+    
+    def set_compiled_table(self, table):
+        """Install a compiled table and the lexer for its terminals"""
+        self.compiled_table = table
+        self.lexer = Lexer(table.terminals, self.lexer_patterns())
+        self.recovery = None
+        self.table_key = self.table_fingerprint()
+    
+    def worker_settings(self):
+        """Attributes that Batch.init_worker copies onto the parser of every worker"""
+        return {'construction': self.construction, 'compress_table': self.compress_table,
+                'skip_unit_reductions': self.skip_unit_reductions}
+    
+    def lexer_patterns(self):
+        """Token patterns of the lexer: Lexer.TOKEN_PATTERNS updated with the grammar's own"""
+        return {**TOKEN_PATTERNS, **self.token_patterns} if self.token_patterns else TOKEN_PATTERNS
+    
+    def table_fingerprint(self):
+        """Hash of the grammar and table options, used as the key of the on-disk table cache"""
+        return grammar_fingerprint(self.N, self.T, self.S, self.P, self.precedence, self.compress_table,
+                                   self.construction, self.skip_unit_reductions)
+    
+    def load_cached_table(self, cache_dir=None):
+        """Load the compiled table from the on-disk cache; False on a miss or a stale file"""
+        fingerprint = self.table_fingerprint()
+        table = CompiledTable.load(table_cache_path(fingerprint, cache_dir), fingerprint)
+        if table is None:
+            return False
+        self.set_compiled_table(table)
+        return True
+    
+    def save_cached_table(self, cache_dir=None):
+        """Store the compiled table so that later runs can skip table generation"""
+        fingerprint = self.table_fingerprint()
+        self.compiled_table.save(table_cache_path(fingerprint, cache_dir), fingerprint)
+    
+    def find_errors(self, input_string, repair=False):
+        """Every syntax error of input_string in one pass, as a list of Recovery.ParseError
+        
+        Parsing goes on after each error: panic mode on FOLLOW-set tokens, or with
+        repair set, first the cheapest repair of a few token insertions/deletions
+        (see Recovery.ErrorRecovery). An empty list means the input is valid.
+        """
+        if self.recovery is None:
+            if not self.follow_masks:
+                self.compute_first_sets()
+            table = self.compiled_table
+            self.recovery = ErrorRecovery(table, self.lexer, [self.follow_masks[nt] for nt in table.nonterminals])
+        return self.recovery.errors(input_string, repair)
@@ -0,0 +1,108 @@
+import ast
+
+from IR import literal_value
+
+BINARY_OPERATORS = {'+': ast.Add, '-': ast.Sub, '*': ast.Mult, '/': ast.Div}
+UNARY_OPERATORS = {'uminus': ast.USub}
+
+
+def compile_quads(quads, result, source='<formula>'):
+    """Compile three-address code to a Python function formula(env)
+
+    env maps the variables of the code to values: numbers for one row, or
+    NumPy arrays (or any mapping of columns, e.g. a DataFrame) to evaluate a
+    whole batch with one vectorized operation per quad. The code is compiled
+    once to bytecode; formula.variables lists the names it reads from env.
+    Temporaries and variables are renamed to local names, so identifiers that
+    are Python keywords or look like temporaries need no escaping.
+    """
+    local_of = {}  # operand -> local name
+    variables = []
+    body = []
+
+    def load(operand):
+        value = literal_value(operand)
+        if value is not None:
+            return ast.Constant(value)
+        name = local_of.get(operand)
+        if name is None:
+            # First read of a variable: fetch it from env once
+            name = local_of[operand] = f'v{len(variables)}'
+            variables.append(operand)
+            body.append(ast.Assign(
+                targets=[ast.Name(name, ast.Store())],
+                value=ast.Subscript(ast.Name('env', ast.Load()), ast.Constant(operand), ast.Load())))
+        return ast.Name(name, ast.Load())
+
+    for quad in quads:
+        if quad.arg2 is None:
+            value = ast.UnaryOp(UNARY_OPERATORS[quad.op](), load(quad.arg1))
+        else:
+            value = ast.BinOp(load(quad.arg1), BINARY_OPERATORS[quad.op](), load(quad.arg2))
+        name = local_of[quad.result] = f'_t{len(body)}'  # fresh per assignment, temporaries may be reused
+        body.append(ast.Assign(targets=[ast.Name(name, ast.Store())], value=value))
+    body.append(ast.Return(load(result)))
+
+    function = ast.FunctionDef(
+        name='formula',
+        args=ast.arguments(posonlyargs=[], args=[ast.arg('env')], kwonlyargs=[], kw_defaults=[], defaults=[]),
+        body=body, decorator_list=[], returns=None)
+    module = ast.fix_missing_locations(ast.Module(body=[function], type_ignores=[]))
+    namespace = {}
+    exec(compile(module, source, 'exec'), namespace)
+    formula = namespace['formula']
+    formula.variables = variables
+    return formula
+
+
+def random_expression(rng, variables, depth=0):
+    """Random expression over variables, small integer literals, + - * /, parentheses and unary minus"""
+    roll = rng.random()
+    if depth > 5 or roll < 0.3:
+        return rng.choice(variables) if rng.random() < 0.7 else str(rng.randint(0, 9))
+    if roll < 0.4:
+        return f"-({random_expression(rng, variables, depth + 1)})"
+    if roll < 0.5:
+        return f"({random_expression(rng, variables, depth + 1)})"
+    return random_expression(rng, variables, depth + 1) + rng.choice('+-*/') + random_expression(rng, variables, depth + 1)
+
+
+def check_against_python(translator, count=3000, seed=0):
+    """Compare compile_input formulas with Python's own evaluation on random expressions
+
+    Returns the mismatching (expression, formula value, Python value) triples;
+    run it with optimize_code on and off, as both feed compile_input.
+    """
+    import math
+    import random
+
+    rng = random.Random(seed)
+    env = {'a': 3, 'x': 5, 'y': 7, 'z': 11}
+    mismatches = []
+    for _ in range(count):
+        expression = random_expression(rng, list(env))
+        try:
+            expected = eval(expression, {}, dict(env))
+        except ZeroDivisionError:
+            continue
+        formula = translator.compile_input(expression)
+        value = formula(env) if formula is not None else None
+        if value is None or not math.isclose(value, expected, rel_tol=1e-9, abs_tol=1e-9):
+            mismatches.append((expression, value, expected))
+    return mismatches
+
+
+if __name__ == "__main__":
+    from Translator import LR1Translator
+
+    translator = LR1Translator()
+    if not translator.load_cached_table():
+        translator.compute_first_sets()
+        translator.build_canonical_collection()
+        translator.build_parsing_table()
+    for optimize_code in (False, True):
+        translator.optimize_code = optimize_code
+        mismatches = check_against_python(translator)
+        print(f"optimize_code={optimize_code}: {len(mismatches)} mismatches")
+        for expression, value, expected in mismatches[:10]:
+            print(f"  {expression}: formula {value}, Python {expected}")
@@ -0,0 +1,173 @@
+def terminal_bits(terminals):
+    """Bit of every terminal in the masks below: terminal i is 1 << i"""
+    return {t: 1 << i for i, t in enumerate(terminals)}
+
+
+def mask_symbols(mask, terminals):
+    """Terminals of a bitmask, in terminal order"""
+    symbols = []
+    while mask:
+        low = mask & -mask
+        symbols.append(terminals[low.bit_length() - 1])
+        mask ^= low
+    return symbols
+
+
+def bits_of(mask):
+    """Single-bit masks of a bitmask, lowest first"""
+    bits = []
+    while mask:
+        low = mask & -mask
+        bits.append(low)
+        mask ^= low
+    return bits
+
+
+def nullable_nonterminals(productions):
+    """Non-terminals that derive epsilon, in time linear in the size of the grammar
+
+    productions is a list of (left, right) with right a tuple of symbols. Every
+    production counts its symbols not yet known to be nullable; when the count
+    drops to 0 its left side becomes nullable and the productions using it are
+    decremented in turn.
+    """
+    remaining = []
+    uses = {}  # symbol -> indices of the productions it occurs in, once per occurrence
+    worklist = []
+    nullable = set()
+    for index, (left, right) in enumerate(productions):
+        remaining.append(len(right))
+        for symbol in right:
+            uses.setdefault(symbol, []).append(index)
+        if not right and left not in nullable:
+            nullable.add(left)
+            worklist.append(left)
+
+    while worklist:
+        symbol = worklist.pop()
+        for index in uses.get(symbol, ()):
+            remaining[index] -= 1
+            if not remaining[index]:
+                left = productions[index][0]
+                if left not in nullable:
+                    nullable.add(left)
+                    worklist.append(left)
+    return nullable
+
+
+def strongly_connected_components(nodes, edges):
+    """Tarjan's algorithm without recursion
+
+    edges maps a node to the nodes it depends on. Components are returned
+    dependencies first, so every edge leaving a component points to one that
+    comes earlier in the list.
+    """
+    index_of = {}
+    lowlink = {}
+    stack = []
+    on_stack = set()
+    components = []
+    counter = 0
+
+    for root in nodes:
+        if root in index_of:
+            continue
+        index_of[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(edges.get(root, ())))]
+        while work:
+            node, successors = work[-1]
+            for successor in successors:
+                if successor not in index_of:
+                    index_of[successor] = lowlink[successor] = counter
+                    counter += 1
+                    stack.append(successor)
+                    on_stack.add(successor)
+                    work.append((successor, iter(edges.get(successor, ()))))
+                    break
+                if successor in on_stack and index_of[successor] < lowlink[node]:
+                    lowlink[node] = index_of[successor]
+            else:
+                work.pop()
+                if work and lowlink[node] < lowlink[work[-1][0]]:
+                    lowlink[work[-1][0]] = lowlink[node]
+                if lowlink[node] == index_of[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+    return components
+
+
+def propagate(nodes, edges, base):
+    """Least masks with mask[n] = base[n] | mask[m] for every edge n -> m, one pass over the SCCs"""
+    masks = {}
+    for component in strongly_connected_components(nodes, edges):
+        members = set(component)
+        mask = 0
+        for node in component:
+            mask |= base.get(node, 0)
+            for successor in edges.get(node, ()):
+                if successor not in members:
+                    mask |= masks[successor]
+        for node in component:
+            masks[node] = mask
+    return masks
+
+
+def first_masks(nonterminals, productions, bits, nullable):
+    """FIRST of every non-terminal as a terminal bitmask (without epsilon, see nullable)"""
+    base = {}
+    edges = {nt: set() for nt in nonterminals}
+    for left, right in productions:
+        for symbol in right:
+            bit = bits.get(symbol)
+            if bit is not None:
+                base[left] = base.get(left, 0) | bit
+                break
+            edges[left].add(symbol)
+            if symbol not in nullable:
+                break
+    return propagate(nonterminals, edges, base)
+
+
+def follow_masks(nonterminals, productions, bits, nullable, first, start, end_bit):
+    """FOLLOW of every non-terminal as a terminal bitmask; end_bit is the bit of '$'"""
+    base = {start: end_bit}
+    edges = {nt: set() for nt in nonterminals}
+    for left, right in productions:
+        # Walk the right side backwards keeping FIRST of the suffix after each symbol
+        suffix_mask, suffix_nullable = 0, True
+        for symbol in reversed(right):
+            bit = bits.get(symbol)
+            if bit is not None:
+                suffix_mask, suffix_nullable = bit, False
+                continue
+            if symbol in edges:
+                base[symbol] = base.get(symbol, 0) | suffix_mask
+                if suffix_nullable:
+                    edges[symbol].add(left)
+            if symbol in nullable:
+                suffix_mask |= first.get(symbol, 0)
+            else:
+                suffix_mask, suffix_nullable = first.get(symbol, 0), False
+    return propagate(nonterminals, edges, base)
+
+
+def string_first(symbols, bits, first, nullable):
+    """(FIRST mask, nullable) of a string of symbols"""
+    mask = 0
+    for symbol in symbols:
+        bit = bits.get(symbol)
+        if bit is not None:
+            return mask | bit, False
+        mask |= first.get(symbol, 0)
+        if symbol not in nullable:
+            return mask, False
+    return mask, True
@@ -0,0 +1,273 @@
+import re
+import sys
+from collections import namedtuple
+
+# Spellings of the empty right side in grammar files
+EPSILON = ('ε', 'epsilon', '%empty')
+
+# Symbols of gramatica_productie.txt that are written differently in the productions
+# than in the terminal line: 'id' is the identifier terminal 'a'.
+SYMBOL_ALIASES = {'id': 'a'}
+
+# Associativity of the precedence declarations of BNF grammar files
+ASSOCIATIVITY = {'%left': 'left', '%right': 'right', '%nonassoc': 'nonassoc'}
+
+# Operator precedence of a grammar: levels maps a terminal to (level, associativity),
+# higher levels binding tighter; rules maps a production number to the symbol whose
+# precedence it takes instead of that of its last terminal ('%prec symbol')
+Precedence = namedtuple('Precedence', 'levels rules')
+
+# One declaration of a %token line: a terminal, optionally followed by /regex/ ('\/' for a slash)
+TOKEN_DECLARATION = re.compile(r"""\s*(?:([^\s/]+)(?:\s*/((?:\\.|[^/\\])*)/)?|(\S))""")
+
+# One token of a BNF line: quoted literal, arrow, alternative bar or bare symbol
+BNF_TOKEN = re.compile(r"""'([^']+)'|"([^"]+)"|(::=|->|\|)|(\S+)""")
+
+
+def format_right(right):
+    """Right side for display: 'E+T' for one-character symbols, 'expr + term' otherwise, ε if empty"""
+    if not right:
+        return 'ε'
+    if isinstance(right, str) or all(len(symbol) == 1 for symbol in right):
+        return ''.join(right)
+    return ' '.join(right)
+
+
+def declare_precedence(*declarations, rules=None):
+    """Precedence from yacc-style declarations, lowest level first
+
+    declare_precedence(('left', '+', '-'), ('left', '*', '/'), ('right', 'UMINUS'), rules={7: 'UMINUS'})
+    """
+    levels = {}
+    for level, (associativity, *symbols) in enumerate(declarations, 1):
+        if associativity not in ASSOCIATIVITY.values():
+            raise ValueError(f"unknown associativity {associativity!r}")
+        for symbol in symbols:
+            levels[sys.intern(symbol)] = (level, associativity)
+    return Precedence(levels, dict(rules or {}))
+
+
+def production_precedences(precedence, rhs, terminals):
+    """Production number -> (level, associativity) for the productions of rhs that have a precedence
+
+    As in yacc, a production has the precedence of its %prec symbol, or else
+    that of the last terminal of its right side.
+    """
+    result = {}
+    for prod_num, right in rhs.items():
+        symbol = precedence.rules.get(prod_num)
+        if symbol is None:
+            symbol = next((s for s in reversed(right) if s in terminals), None)
+        if symbol in precedence.levels:
+            result[prod_num] = precedence.levels[symbol]
+    return result
+
+
+def resolve_shift_reduce(rule, token):
+    """Winner of a shift/reduce conflict between a production and a lookahead, given their precedences
+
+    'reduce' if the production binds tighter, 'shift' if the token does; on equal
+    levels the associativity decides: left reduces, right shifts and nonassoc
+    makes the entry an error. None if either side has no declared precedence.
+    """
+    if rule is None or token is None:
+        return None
+    if rule[0] != token[0]:
+        return 'reduce' if rule[0] > token[0] else 'shift'
+    return {'left': 'reduce', 'right': 'shift', 'nonassoc': 'error'}[token[1]]
+
+
+def load_grammar(path):
+    """Read a grammar file into (N, T, S, P, precedence, token_patterns) for set_grammar; see parse_grammar"""
+    with open(path, encoding='utf-8') as f:
+        return parse_grammar(f.read(), path)
+
+
+def parse_grammar(text, source='<grammar>'):
+    """Parse grammar text in the gramatica_productie.txt format or in BNF
+
+    Returns (N, T, S, P, precedence, token_patterns). Right sides of P are
+    tuples of interned symbol strings, numbered from 1 in file order. precedence
+    is a Precedence and token_patterns maps terminals to the regular expressions
+    their lexemes match (see Lexer); both are None if the grammar declares none,
+    as always for the classic format. BNF is recognized by the '->' or '::=' of
+    its productions.
+    """
+    lines = [line for line in text.splitlines() if line.strip() and not line.lstrip().startswith('#')]
+    if any('->' in line or '::=' in line for line in lines):
+        return parse_bnf(lines, source)
+    return parse_classic(lines, source)
+
+
+def parse_classic(lines, source='<grammar>'):
+    """gramatica_productie.txt format: N line, T line, S line, then one 'LHS RHS' production per line
+
+    A right side without blanks is split into the longest known symbols, so
+    'E+T' and '-(E)' work like in the C generator; with blanks it is split on them.
+    """
+    if len(lines) < 3:
+        raise ValueError(f"{source}: expected the N, T and S lines before the productions")
+    intern = sys.intern
+    N = [intern(symbol) for symbol in lines[0].split()]
+    T = [intern(symbol) for symbol in lines[1].split()]
+    S = intern(lines[2].strip())
+    if S not in N:
+        raise ValueError(f"{source}: start symbol {S!r} is not a non-terminal")
+
+    symbols = {symbol: symbol for symbol in N + T}
+    symbols.update((alias, symbols[target]) for alias, target in SYMBOL_ALIASES.items()
+                   if target in symbols and alias not in symbols)
+    for spelling in EPSILON:
+        symbols.setdefault(spelling, None)
+    # Longest spelling first, so that 'id' is not read as 'i' 'd'
+    splitter = re.compile('|'.join(map(re.escape, sorted(symbols, key=len, reverse=True))))
+
+    P = {}
+    for line_no, line in enumerate(lines[3:], 4):
+        parts = line.split(None, 1)
+        left = symbols.get(parts[0])
+        if left not in N:
+            raise ValueError(f"{source}:{line_no}: {parts[0]!r} is not a non-terminal")
+        if len(parts) == 1:
+            spellings = []
+        elif any(c.isspace() for c in parts[1].strip()):
+            spellings = parts[1].split()
+        else:
+            spellings = []
+            right_text = parts[1].strip()
+            pos = 0
+            while pos < len(right_text):
+                match = splitter.match(right_text, pos)
+                if match is None:
+                    raise ValueError(f"{source}:{line_no}: unknown symbol at {right_text[pos:]!r}")
+                spellings.append(match.group())
+                pos = match.end()
+        right = []
+        for spelling in spellings:
+            if spelling not in symbols:
+                raise ValueError(f"{source}:{line_no}: unknown symbol {spelling!r}")
+            if symbols[spelling] is not None:  # epsilon adds nothing
+                right.append(symbols[spelling])
+        P[len(P) + 1] = (left, tuple(right))
+    return N, T, S, P, None, None
+
+
+def parse_bnf(lines, source='<grammar>'):
+    """BNF with multi-character symbols: 'expr -> expr "+" term | term'
+
+    Symbols are separated by blanks. Quoted symbols are always terminals, bare
+    ones are non-terminals when they have a production and terminals otherwise.
+    An empty alternative, ε, epsilon or %empty is an epsilon production. A line
+    starting with '|' continues the previous rule. '%start X' sets the start
+    symbol (default: the first left side) and '%token a b ...' fixes the order of T;
+    a terminal in %token followed by /regex/, as in '%token id /[A-Za-z_]\\w*/',
+    matches that pattern instead of its own spelling.
+
+    '%left', '%right' and '%nonassoc' lines declare operator precedence as in
+    yacc, one level per line from the loosest to the tightest binding, and
+    '%prec symbol' at the end of an alternative gives it the precedence of symbol.
+    """
+    intern = sys.intern
+    rules = []  # (left, [alternative, ...]) with alternatives as [(symbol, quoted), ...]
+    declared_tokens = []
+    token_patterns = {}  # terminal -> regex of its lexemes
+    levels = {}  # symbol -> (level, associativity)
+    start = None
+
+    for line_no, line in enumerate(lines, 1):
+        words = line.split()
+        if words[0] == '%start':
+            if len(words) != 2:
+                raise ValueError(f"{source}:{line_no}: %start takes one symbol")
+            start = intern(words[1])
+            continue
+        if words[0] == '%token':
+            declaration = line.split('%token', 1)[1]
+            for m in TOKEN_DECLARATION.finditer(declaration):
+                if m.group(1) is None:
+                    raise ValueError(f"{source}:{line_no}: cannot read %token at {declaration[m.start():].strip()!r}")
+                terminal = intern(m.group(1).strip('\'"'))
+                declared_tokens.append(terminal)
+                if m.group(2) is not None:
+                    pattern = m.group(2).replace('\\/', '/')
+                    try:
+                        groups = re.compile(pattern).groups
+                    except re.error as e:
+                        raise ValueError(f"{source}:{line_no}: bad pattern for {terminal!r}: {e}") from None
+                    if groups:
+                        raise ValueError(f"{source}:{line_no}: pattern for {terminal!r} has capturing groups, "
+                                         "use (?:...)")
+                    token_patterns[terminal] = pattern
+            continue
+        if words[0] in ASSOCIATIVITY:
+            level = max((rank for rank, associativity in levels.values()), default=0) + 1
+            for word in words[1:]:
+                levels[intern(word.strip('\'"'))] = (level, ASSOCIATIVITY[words[0]])
+            continue
+
+        tokens = [(m.group(1) or m.group(2), m.group(3), m.group(4)) for m in BNF_TOKEN.finditer(line)]
+        if tokens[0][1] == '|':
+            if not rules:
+                raise ValueError(f"{source}:{line_no}: '|' before the first rule")
+            alternatives = rules[-1][1]
+            alternatives.append([])
+            tokens = tokens[1:]
+        else:
+            if len(tokens) < 2 or tokens[0][2] is None or tokens[1][1] not in ('->', '::='):
+                raise ValueError(f"{source}:{line_no}: expected 'LHS -> RHS'")
+            alternatives = [[]]
+            rules.append((intern(tokens[0][2]), alternatives))
+            tokens = tokens[2:]
+
+        prec = False  # the next symbol follows %prec
+        for quoted, operator, bare in tokens:
+            if prec:
+                if operator is not None:
+                    raise ValueError(f"{source}:{line_no}: %prec takes one symbol")
+                alternatives[-1].append((intern(quoted or bare), None))  # quoted None marks the %prec symbol
+                prec = False
+            elif bare == '%prec':
+                prec = True
+            elif operator == '|':
+                alternatives.append([])
+            elif operator is not None:
+                raise ValueError(f"{source}:{line_no}: unexpected {operator!r}")
+            elif quoted is not None:
+                alternatives[-1].append((intern(quoted), True))
+            elif bare not in EPSILON:
+                alternatives[-1].append((intern(bare), False))
+        if prec:
+            raise ValueError(f"{source}:{line_no}: %prec takes one symbol")
+
+    if not rules:
+        raise ValueError(f"{source}: no productions")
+
+    N = list(dict.fromkeys(left for left, alternatives in rules))
+    nonterminals = set(N)
+    T = list(declared_tokens)
+    terminals = set(T)
+    P = {}
+    prec_rules = {}  # production number -> %prec symbol
+    for left, alternatives in rules:
+        for alternative in alternatives:
+            right = []
+            for symbol, quoted in alternative:
+                if quoted is None:
+                    prec_rules[len(P) + 1] = symbol
+                    continue
+                if quoted and symbol in nonterminals:
+                    raise ValueError(f"{source}: quoted terminal {symbol!r} is also a non-terminal")
+                if symbol not in nonterminals and symbol not in terminals:
+                    terminals.add(symbol)
+                    T.append(symbol)
+                right.append(symbol)
+            P[len(P) + 1] = (left, tuple(right))
+
+    S = start or N[0]
+    if S not in nonterminals:
+        raise ValueError(f"{source}: start symbol {S!r} has no productions")
+    for prod_num, symbol in prec_rules.items():
+        if symbol not in levels:
+            raise ValueError(f"{source}: %prec symbol {symbol!r} of production {prod_num} has no declared precedence")
+    precedence = Precedence(levels, prec_rules) if levels else None
+    return N, T, S, P, precedence, token_patterns or None
@@ -0,0 +1,182 @@
+import sys
+from collections import namedtuple
+
+COMMUTATIVE = frozenset({'+', '*'})
+INFINITY = float('inf')
+
+
+class Quad(namedtuple('Quad', 'result op arg1 arg2')):
+    """Three-address instruction result := arg1 op arg2; arg2 is None for unary operators like uminus"""
+
+    __slots__ = ()
+
+    def __str__(self):
+        if self.arg2 is None:
+            return f"{self.result} := {self.op} {self.arg1}"
+        return f"{self.result} := {self.arg1} {self.op} {self.arg2}"
+
+
+def literal_value(operand):
+    """Numeric value of a literal operand such as '3', '2.5' or a folded '1e+22', None for names"""
+    if operand[0].isdigit() or (operand[0] == '-' and operand[1:2].isdigit()):
+        try:
+            return int(operand)
+        except ValueError:
+            pass
+        try:
+            return float(operand)
+        except ValueError:
+            return None  # a custom token pattern let through something like '2x'
+    return None
+
+
+def fold(op, arg1, arg2):
+    """Constant operand of op over literal arguments, None when it cannot be folded exactly"""
+    x = literal_value(arg1)
+    if x is None:
+        return None
+    if arg2 is None:
+        return sys.intern(str(-x)) if op == 'uminus' else None
+    y = literal_value(arg2)
+    if y is None:
+        return None
+    if op == '+':
+        value = x + y
+    elif op == '-':
+        value = x - y
+    elif op == '*':
+        value = x * y
+    elif op == '/':
+        if not y:
+            return None  # leave the division by zero to run time
+        if isinstance(x, int) and isinstance(y, int):
+            if x % y:
+                return None  # keep integer division semantics to the evaluator
+            value = x // y
+        else:
+            value = x / y
+    else:
+        return None
+    if value != value or value in (INFINITY, -INFINITY):
+        return None  # overflow or nan: 'inf' and 'nan' would read back as names, leave them to run time
+    return sys.intern(str(value))
+
+
+def value_numbering(quads, result):
+    """Local value numbering: constant folding and common subexpression elimination
+
+    The translator's code is one basic block in which every temporary is
+    assigned once; already optimized code reuses temporaries, so an expression
+    only stays available until its temporary or one of its operands is
+    reassigned, and a temporary is only renamed to a holder that keeps its
+    value until the temporary's last read. Quads whose value is a constant or
+    already held by another name are dropped and their uses renamed. Returns
+    (quads, result) with result renamed as well.
+    """
+    # Per quad: index of the quad overwriting its result, and of the last read of that value
+    overwritten = [len(quads)] * len(quads)
+    last_read = [-1] * len(quads)
+    definition = {}  # name -> index of the quad whose value it holds
+    for i, quad in enumerate(quads):
+        for arg in (quad.arg1, quad.arg2):
+            j = definition.get(arg)
+            if j is not None:
+                last_read[j] = i
+        j = definition.get(quad.result)
+        if j is not None:
+            overwritten[j] = i
+        definition[quad.result] = i
+    if result in definition:
+        last_read[definition[result]] = len(quads)
+
+    replacement = {}  # dropped temporary -> operand holding its value
+    available = {}  # (op, arg1, arg2) -> (temporary holding it, index of its quad)
+    written = set()
+    optimized = []
+    for i, quad in enumerate(quads):
+        arg1 = replacement.get(quad.arg1, quad.arg1)
+        arg2 = replacement.get(quad.arg2, quad.arg2)
+        replacement.pop(quad.result, None)  # a new value from here on
+
+        constant = fold(quad.op, arg1, arg2)
+        if constant is not None:
+            replacement[quad.result] = constant
+            continue
+
+        key = (quad.op, arg1, arg2)
+        if quad.op in COMMUTATIVE and arg2 < arg1:
+            key = (quad.op, arg2, arg1)
+        holder = available.get(key)
+        if holder is not None and overwritten[holder[1]] >= last_read[i]:
+            replacement[quad.result] = holder[0]
+            continue
+
+        name = quad.result
+        if name in written:
+            # A reassignment invalidates what the name held and every expression reading it
+            for stale in [k for k, (holder_name, j) in available.items() if name in (holder_name, k[1], k[2])]:
+                del available[stale]
+        written.add(name)
+        if name not in (arg1, arg2):
+            available[key] = (name, i)
+        optimized.append(Quad(name, quad.op, arg1, arg2))
+    return optimized, replacement.get(result, result)
+
+
+def eliminate_dead(quads, live_out):
+    """Drop quads whose result is not used by a later quad or by live_out"""
+    live = set(live_out)
+    kept = []
+    for quad in reversed(quads):
+        if quad.result in live:
+            kept.append(quad)
+            live.discard(quad.result)  # dead before this assignment unless the quad reads it
+            live.add(quad.arg1)
+            if quad.arg2 is not None:
+                live.add(quad.arg2)
+    kept.reverse()
+    return kept
+
+
+def reuse_temporaries(quads, result, prefix='t'):
+    """Rename temporaries so that a temporary is reused once its last use is behind
+
+    A quad may write the temporary that one of its own arguments frees. Returns
+    (quads, result) using the fewest names t1, t2, ... this linear scan finds.
+    """
+    temporaries = {quad.result for quad in quads}
+    last_use = {}
+    for i, quad in enumerate(quads):
+        last_use[quad.arg1] = i
+        if quad.arg2 is not None:
+            last_use[quad.arg2] = i
+    if result in temporaries:
+        last_use[result] = len(quads)  # live until the end
+
+    name_of = {}
+    free = []
+    created = 0
+    renamed = []
+    for i, quad in enumerate(quads):
+        arg1 = name_of.get(quad.arg1, quad.arg1)
+        arg2 = name_of.get(quad.arg2, quad.arg2)
+        for arg in (quad.arg1,) if quad.arg2 in (None, quad.arg1) else (quad.arg1, quad.arg2):
+            if arg in temporaries and last_use[arg] == i:
+                free.append(name_of[arg])
+        if free:
+            name = free.pop()
+        else:
+            created += 1
+            name = sys.intern(f"{prefix}{created}")
+        name_of[quad.result] = name
+        renamed.append(Quad(name, quad.op, arg1, arg2))
+        if quad.result not in last_use:
+            free.append(name)  # never read
+    return renamed, name_of.get(result, result)
+
+
+def optimize(quads, result):
+    """Run value numbering, dead temporary elimination and temporary reuse; returns (quads, result)"""
+    quads, result = value_numbering(quads, result)
+    quads = eliminate_dead(quads, {result})
+    return reuse_temporaries(quads, result)
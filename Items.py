@@ -0,0 +1,45 @@
+from FirstFollow import mask_symbols
+
+
+class ItemCores:
+    """Dense ids for the LR(0) items (production, dot position) of a grammar
+
+    An LR(1) item set is stored as a pair of tuples (core ids ascending,
+    lookahead masks), one entry per core with all of its lookaheads as a
+    terminal bitmask (see FirstFollow.terminal_bits). Such states hash and
+    compare as two flat tuples, and their LR(0) core is simply the first one.
+
+    The cores of a production are numbered consecutively, so moving the dot
+    over the next symbol turns core c into core c + 1; cores are numbered in
+    ascending production number, so sorted core ids are sorted (prod_num, dot_pos).
+    """
+
+    def __init__(self, rhs):
+        self.prod = []  # core -> production number
+        self.dot = []  # core -> dot position
+        self.next_symbol = []  # core -> symbol after the dot, None when the dot is at the end
+        self.start = {}  # production number -> core with the dot at the beginning
+        for prod_num in sorted(rhs):
+            right = rhs[prod_num]
+            self.start[prod_num] = len(self.prod)
+            for dot_pos in range(len(right) + 1):
+                self.prod.append(prod_num)
+                self.dot.append(dot_pos)
+                self.next_symbol.append(right[dot_pos] if dot_pos < len(right) else None)
+
+    def items(self, state, terminals):
+        """(prod_num, dot_pos, lookahead) tuples of a state, sorted"""
+        return [(self.prod[core], self.dot[core], lookahead)
+                for core, mask in zip(*state)
+                for lookahead in sorted(mask_symbols(mask, terminals))]
+
+
+def freeze(items):
+    """State (core ids, lookahead masks) of a {core: mask} dict"""
+    cores = tuple(sorted(items))
+    return cores, tuple(items[core] for core in cores)
+
+
+def merge_states(state_a, state_b):
+    """Union of two states with the same LR(0) core"""
+    return state_a[0], tuple(a | b for a, b in zip(state_a[1], state_b[1]))
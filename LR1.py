@@ -1,11 +1,23 @@
-class LR1Parser:
+import sys
+
+from Batch import parse_indexed, parse_one, run_batch
+from Engine import LR1Engine
+from Grammar import format_right
+from ParseTable import ACCEPT
+from Stats import ProfilingParser, profile_run
+from Streaming import PushParser
+from Trace import TextTracer
+from Vectorized import recognize_batch
+
+
+class LR1Parser(LR1Engine):
     def __init__(self):
         # Define the grammar G=(N,T,S,P)
-        self.N = ['E', 'T', 'F']  # Non-terminals
-        self.T = ['a', '+', '-', '*', '/', '(', ')']  # Terminals (including 'a' for identifiers)
-        self.S = 'E'  # Start symbol
+        N = ['E', 'T', 'F']  # Non-terminals
+        T = ['a', '+', '-', '*', '/', '(', ')']  # Terminals (including 'a' for identifiers)
+        S = 'E'  # Start symbol
         # Productions P with numbers
-        self.P = {
+        P = {
             1: ('E', 'E+T'),
             2: ('E', 'T'), 
             3: ('T', 'T*F'),
@@ -13,264 +25,7 @@ class LR1Parser:
             5: ('F', '(E)'),
             6: ('F', 'a') 
         }
-        
-        # Augmented grammar with S' -> S
-        self.augmented_P = {0: ("S'", 'E')}
-        self.augmented_P.update(self.P)
-        
-        self.itemsets = []  # Canonical collection of LR(1) itemsets
-        self.parsing_table = {}  # LR(1) parsing table
-        self.first_sets = {}  # FIRST sets for non-terminals
-        
-    def compute_first_sets(self):
-        """Compute FIRST sets for all non-terminals"""
-        # Initialize FIRST sets
-        for nt in self.N:
-            self.first_sets[nt] = set()
-        for t in self.T:
-            self.first_sets[t] = {t}
-        
-        # Add epsilon for completeness (though not used in this grammar)
-        self.first_sets['ε'] = {'ε'}
-        
-        changed = True
-        while changed:
-            changed = False
-            for prod_num, (left, right) in self.P.items():
-                # For each production left -> right
-                symbols = list(right)
-                
-                # Check if all symbols can derive epsilon (not in this grammar)
-                all_epsilon = True
-                for symbol in symbols:
-                    if symbol in self.T:  # Terminal
-                        # Add terminal to FIRST(left)
-                        if symbol not in self.first_sets[left]:
-                            self.first_sets[left].add(symbol)
-                            changed = True
-                        break
-                    else:  # Non-terminal
-                        # Add FIRST(non_terminal) to FIRST(left)
-                        first_of_symbol = self.first_sets.get(symbol, set())
-                        new_terminals = first_of_symbol - self.first_sets[left]
-                        if new_terminals:
-                            self.first_sets[left].update(new_terminals)
-                            changed = True
-                        # If this non-terminal doesn't contain epsilon, stop
-                        if 'ε' not in first_of_symbol:
-                            break
-    
-    def first_of_string(self, string, lookahead):
-        """Compute FIRST of a string of symbols"""
-        if not string:
-            return {lookahead}
-        
-        result = set()
-        all_epsilon = True
-        
-        for symbol in string:
-            if symbol in self.T:  # Terminal
-                result.add(symbol)
-                all_epsilon = False
-                break
-            else:  # Non-terminal
-                first = self.first_sets.get(symbol, set())
-                # Remove epsilon if present
-                if 'ε' in first:
-                    first = first - {'ε'}
-                result.update(first)
-                if 'ε' not in self.first_sets.get(symbol, set()):
-                    all_epsilon = False
-                    break
-        
-        if all_epsilon:
-            result.add(lookahead)
-            
-        return result
-    
-    def closure(self, items):
-        """Compute closure of a set of LR(1) items"""
-        closure_set = set(items)
-        changed = True
-        
-        while changed:
-            changed = False
-            new_items = set()
-            
-            for item in list(closure_set):
-                # item format: (prod_num, dot_pos, lookahead)
-                prod_num, dot_pos, lookahead = item
-                left, right = self.augmented_P[prod_num]
-                symbols = list(right)
-                
-                # If dot is at the end, nothing to do
-                if dot_pos >= len(symbols):
-                    continue
-                
-                next_symbol = symbols[dot_pos]
-                
-                # If next symbol is a non-terminal, we need to add its productions
-                if next_symbol in self.N:
-                    # Get the remaining symbols after the next_symbol
-                    remaining_symbols = symbols[dot_pos + 1:]
-                    
-                    # Compute lookaheads for the new items
-                    lookaheads = self.first_of_string(remaining_symbols, lookahead)
-                    
-                    # Add all productions of this non-terminal with each lookahead
-                    for new_prod_num, (new_left, new_right) in self.augmented_P.items():
-                        if new_left == next_symbol:
-                            for la in lookaheads:
-                                new_item = (new_prod_num, 0, la)  # Dot at beginning
-                                if new_item not in closure_set and new_item not in new_items:
-                                    new_items.add(new_item)
-                                    changed = True
-            
-            closure_set.update(new_items)
-        
-        return closure_set
-    
-    def goto(self, itemset, symbol):
-        """Compute GOTO for an itemset and symbol"""
-        new_items = set()
-        
-        for item in itemset:
-            prod_num, dot_pos, lookahead = item
-            left, right = self.augmented_P[prod_num]
-            symbols = list(right)
-            
-            # If dot is before our symbol, move dot past it
-            if dot_pos < len(symbols) and symbols[dot_pos] == symbol:
-                new_item = (prod_num, dot_pos + 1, lookahead)
-                new_items.add(new_item)
-        
-        # Return closure of the new items
-        return self.closure(new_items) if new_items else set()
-    
-    def itemsets_are_equal(self, set1, set2):
-        """Check if two itemsets are equal"""
-        return set1 == set2
-    
-    def build_canonical_collection(self):
-        #"""Build the canonical collection of LR(1) itemsets"""
-        #print("Building canonical collection of LR(1) itemsets...")
-        
-        # Start with initial itemset I0
-        initial_item = (0, 0, '$')  # (S' -> .E, $)
-        I0 = self.closure({initial_item})
-        self.itemsets = [I0]
-        
-        # Use queue to process itemsets
-        queue = [0]
-        processed = set()
-        
-        while queue:
-            current_idx = queue.pop(0)
-            if current_idx in processed:
-                continue
-            processed.add(current_idx)
-            
-            current_itemset = self.itemsets[current_idx]
-            print(f"\nProcessing I{current_idx} ({len(current_itemset)} items):")
-            
-            # Display items in this itemset
-            for item in sorted(current_itemset):
-                prod_num, dot_pos, lookahead = item
-                left, right = self.augmented_P[prod_num]
-                symbols = list(right)
-                
-                # Create dotted production string
-                dotted_right = ' '.join(symbols[:dot_pos] + ['.'] + symbols[dot_pos:])
-                print(f"  [{left} -> {dotted_right}, {lookahead}]")
-            
-            # Try all symbols (terminals and non-terminals)
-            all_symbols = self.T + self.N
-            
-            for symbol in all_symbols:
-                goto_set = self.goto(current_itemset, symbol)
-                
-                if goto_set:
-                    # Check if this itemset already exists
-                    found_idx = -1
-                    for idx, existing_set in enumerate(self.itemsets):
-                        if self.itemsets_are_equal(existing_set, goto_set):
-                            found_idx = idx
-                            break
-                    
-                    if found_idx == -1:
-                        # New itemset
-                        found_idx = len(self.itemsets)
-                        self.itemsets.append(goto_set)
-                        queue.append(found_idx)
-                        #print(f"    I{current_idx} --{symbol}--> I{found_idx} (NEW)")
-                    # else:
-                    #     print(f"    I{current_idx} --{symbol}--> I{found_idx} (EXISTING)")
-        
-        print(f"\nCanonical collection complete: {len(self.itemsets)} states generated")
-    
-    def build_parsing_table(self):
-        """Build LR(1) parsing table from canonical collection"""
-        print("\nBuilding LR(1) parsing table...")
-        
-        # Initialize empty table
-        for i in range(len(self.itemsets)):
-            self.parsing_table[i] = {}
-            for terminal in self.T + ['$']:
-                self.parsing_table[i][terminal] = ''
-            for non_terminal in self.N:
-                self.parsing_table[i][non_terminal] = ''
-        
-        # Fill the table using standard LR(1) algorithm
-        for i, itemset in enumerate(self.itemsets):
-            #print(f"\nProcessing I{i} for parsing table:")
-            
-            # Process each item in the itemset
-            for item in itemset:
-                prod_num, dot_pos, lookahead = item
-                left, right = self.augmented_P[prod_num]
-                symbols = list(right)
-                
-                # Case 1: Dot is not at the end (shift or goto)
-                if dot_pos < len(symbols):
-                    next_symbol = symbols[dot_pos]
-                    goto_set = self.goto(itemset, next_symbol)
-                    
-                    if goto_set:
-                        goto_index = self.itemsets.index(goto_set)
-                        
-                        if next_symbol in self.T:  # Terminal - shift action
-                            action = f's{goto_index}'
-                            current_action = self.parsing_table[i][next_symbol]
-                            if current_action and current_action != action:
-                                print(f"    CONFLICT at I{i},{next_symbol}: {current_action} vs {action}")
-                            else:
-                                self.parsing_table[i][next_symbol] = action
-                                print(f"    ACTION[{i},{next_symbol}] = {action}")
-                        else:  # Non-terminal - goto action
-                            current_goto = self.parsing_table[i][next_symbol]
-                            if current_goto and current_goto != str(goto_index):
-                                print(f"    GOTO conflict at I{i},{next_symbol}: {current_goto} vs {goto_index}")
-                            else:
-                                self.parsing_table[i][next_symbol] = str(goto_index)
-                                print(f"    GOTO[{i},{next_symbol}] = {goto_index}")
-                
-                # Case 2: Dot is at the end (reduce or accept)
-                else:
-                    if prod_num == 0 and lookahead == '$':  # S' -> E.
-                        self.parsing_table[i][lookahead] = 'acc'
-                        print(f"    ACTION[{i},{lookahead}] = acc")
-                    else:  # Reduce action
-                        # Find the original production number (excluding augmented)
-                        original_prod_num = prod_num
-                        action = f'r{original_prod_num}'
-                        
-                        current_action = self.parsing_table[i][lookahead]
-                        if current_action and current_action != action:
-                            print(f"    REDUCE CONFLICT at I{i},{lookahead}: {current_action} vs {action}")
-                        else:
-                            self.parsing_table[i][lookahead] = action
-                            prod_left, prod_right = self.P[original_prod_num]
-                            print(f"    ACTION[{i},{lookahead}] = {action} (reduce by {prod_left}->{prod_right})")
+        super().__init__(N, T, S, P)
     
     def display_parsing_table(self):
         """Display the LR(1) parsing table in a readable format"""
@@ -283,13 +38,13 @@ class LR1Parser:
         print(f"  S = {self.S}")
         print("  P = {")
         for num, (left, right) in self.P.items():
-            print(f"    {num}: {left} -> {right}")
+            print(f"    {num}: {left} -> {format_right(right)}")
         print("  }")
         print("="*80)
         
         # Define column order
-        terminals_order = ['a', '+', '-', '*', '/', '(', ')', '$']
-        non_terminals_order = ['E', 'T', 'F']
+        terminals_order = self.T + ['$']
+        non_terminals_order = self.N
         
         # Header
         print(f"{'State':<6}", end="")
@@ -301,107 +56,196 @@ class LR1Parser:
         print()
         print("-" * (6 + 6*len(terminals_order) + 1 + 6*len(non_terminals_order)))
         
-        # Table rows
-        for state in range(len(self.itemsets)):
+        # Table rows, spelled out from the compiled table only for display
+        for state, row in enumerate(self.compiled_table.text_rows()):
             print(f"{state:<6}", end="")
             
             # Action part (terminals)
             for term in terminals_order:
-                action = self.parsing_table[state].get(term, '')
+                action = row.get(term, '')
                 print(f"{action:<6}", end="")
             
             print("|", end="")
             
             # Goto part (non-terminals)
             for nt in non_terminals_order:
-                goto = self.parsing_table[state].get(nt, '')
+                goto = row.get(nt, '')
                 print(f"{goto:<6}", end="")
             
             print()
     
+    def push_parser(self):
+        """Push-style recognizer for input that arrives in chunks (see Streaming.PushParser)"""
+        return PushParser(self.compiled_table, self.lexer)
+    
+    def parse_many(self, inputs, processes=None, chunksize=64, ordered=True, cache_dir=None):
+        """Accept/reject every input on a process pool sharing the memory-mapped table
+        
+        Yields True/False per input in order, or (index, result) pairs as they
+        complete when ordered is False.
+        """
+        return run_batch(self, parse_one, parse_indexed, inputs, processes, chunksize, ordered, cache_dir)
+    
+    def recognize_many(self, inputs):
+        """Accept/reject a batch of inputs in lockstep over NumPy tables (no trace); bool array"""
+        return recognize_batch(self.compiled_table, self.lexer, list(inputs), self.recognize)
+    
     def parse_input(self, input_string):
         """Parse an input string using the generated LR(1) parsing table"""
-        print(f"\nParsing input: {input_string}")
+        if self.tracer is not None:
+            return self.trace_parse(input_string, self.tracer)
+        
+        if self.stats is not None:
+            return profile_run(ProfilingParser(self.compiled_table, self.lexer), self.stats, input_string, 'parse')
+        
+        cache = self.result_cache
+        if cache is None:
+            return self.recognize(input_string)
+        key = (self.table_key, input_string)
+        accepted = cache.get(key)
+        if accepted is None:
+            accepted = self.recognize(input_string)
+            cache.put(key, accepted)
+        return accepted
+    
+    def recognize(self, input_string):
+        """Silent accept/reject of one input, without trace or result cache"""
+        # Fast path: the stack holds states only
+        stack = [0]
+        tokens = self.lexer.tokens(input_string)
+        next_token = tokens.__next__
+        terminal_id = next_token()[0]
         
-        # Initialize stack and input
+        table = self.compiled_table
+        action_base, action_next, action_check = table.action_base, table.action_next, table.action_check
+        goto_base, goto_next = table.goto_base, table.goto_next
+        prod_len, prod_lhs = table.prod_len, table.prod_lhs
+        
+        while True:
+            current_state = stack[-1]
+            action = 0
+            if terminal_id >= 0:
+                i = action_base[current_state] + terminal_id
+                if action_check[i] == current_state:
+                    action = action_next[i]
+            
+            if action > 0:  # Shift
+                stack.append(action)
+                terminal_id = next_token()[0]
+            elif action < ACCEPT:  # Reduce
+                prod_id = -action - 1
+                rhs_length = prod_len[prod_id]
+                if rhs_length:
+                    del stack[-rhs_length:]
+                stack.append(goto_next[goto_base[stack[-1]] + prod_lhs[prod_id]])
+            else:
+                return action == ACCEPT
+    
+    def trace_parse(self, input_string, tracer):
+        """parse_input reporting every step, with symbols kept on the stack for display"""
+        tracer.parse_start(input_string)
+        
+        # Initialize stack and the token stream (terminal_id, lexeme, offset)
         stack = [0]  # Start with state 0
-        input_list = list(input_string) + ['$']
-        position = 0
+        tokens = self.lexer.tokens(input_string)
+        terminal_id, lexeme, offset = next(tokens)
         
-        print(f"{'Step':<4} {'Stack':<30} {'Input':<20} {'Action':<10}")
-        print("-" * 70)
+        # Bind the table buffers to locals; the loop runs until ACCEPT or ERROR
+        table = self.compiled_table
+        action_base, action_next, action_check = table.action_base, table.action_next, table.action_check
+        goto_base, goto_next = table.goto_base, table.goto_next
+        prod_nums, prod_len, prod_lhs = table.prod_nums, table.prod_len, table.prod_lhs
+        unit_chains = table.unit_chains
+        productions = self.P
+        next_token = tokens.__next__
         
         step = 0
         while True:
             current_state = stack[-1]
-            current_input = input_list[position]
+            remaining = input_string[offset:] + '$'
             
-            print(f"{step:<4} {str(stack):<30} {''.join(input_list[position:]):<20}", end="")
-            
-            action = self.parsing_table[current_state].get(current_input, '')
+            # Encoded ACTION[current_state, terminal_id], 0 for errors and unknown characters
+            action = 0
+            if terminal_id >= 0:
+                i = action_base[current_state] + terminal_id
+                if action_check[i] == current_state:
+                    action = action_next[i]
             
             if not action:
-                print(f"{'ERROR':<10}")
-                print("No action defined - parsing failed!")
+                tracer.parse_step(step, stack, remaining, 'error')
                 return False
             
-            if action == 'acc':
-                print(f"{'ACCEPT':<10}")
-                print("Input successfully parsed!")
+            # Unit reductions skipped by a bypassed table: report them and relabel the top symbol
+            chain = unit_chains.get((current_state, terminal_id)) if unit_chains else None
+            if chain:
+                for prod_id in chain:
+                    prod_num = prod_nums[prod_id]
+                    tracer.parse_step(step, stack, remaining, 'reduce', prod_num)
+                    stack[-2] = productions[prod_num][0]
+                    step += 1
+            
+            if action == ACCEPT:
+                tracer.parse_step(step, stack, remaining, 'accept')
                 return True
             
-            elif action.startswith('s'):  # Shift
-                next_state = int(action[1:])
-                stack.append(current_input)  # Push symbol
-                stack.append(next_state)     # Push state
-                position += 1
-                print(f"shift {next_state:<4}")
+            elif action > 0:  # Shift
+                next_state = action
+                tracer.parse_step(step, stack, remaining, 'shift', next_state)
+                stack.append(lexeme)      # Push symbol
+                stack.append(next_state)  # Push state
+                terminal_id, lexeme, offset = next_token()
             
-            elif action.startswith('r'):  # Reduce
-                prod_num = int(action[1:])
-                left, right = self.P[prod_num]
-                rhs_length = len(right)
+            else:  # Reduce
+                prod_id = -action - 1  # decode_reduce(action)
+                prod_num = prod_nums[prod_id]
+                left = productions[prod_num][0]
+                rhs_length = prod_len[prod_id]
+                tracer.parse_step(step, stack, remaining, 'reduce', prod_num)
                 
-                # Pop 2*rhs_length elements (symbols and states)
-                stack = stack[:-2 * rhs_length]
+                # Pop 2*rhs_length elements (symbols and states) in place
+                if rhs_length:
+                    del stack[-2 * rhs_length:]
                 
                 # Get the state after popping
-                goto_state = int(self.parsing_table[stack[-1]][left])
+                goto_state = goto_next[goto_base[stack[-1]] + prod_lhs[prod_id]]
                 stack.append(left)        # Push left-hand side
                 stack.append(goto_state)  # Push goto state
-                
-                print(f"reduce {prod_num:<3}")
             
             step += 1
-            if step > 50:  # Safety limit
-                print("Parsing steps limit exceeded!")
-                return False
 
 def main():
     """Main function to demonstrate LR(1) parser"""
     print("LR(1) PARSING TABLE GENERATOR")
     print("="*50)
     
-    # Create parser
+    # Create parser, tracing construction and parsing in the classic table format
     parser = LR1Parser()
+    parser.tracer = TextTracer()
+    if len(sys.argv) > 1:
+        parser.load_grammar(sys.argv[1])  # e.g. gramatica_productie.txt
     
-    # Step 1: Compute FIRST sets
-    print("\n1. COMPUTING FIRST SETS...")
-    parser.compute_first_sets()
-    print("FIRST sets computed:")
-    for symbol in parser.N:
-        print(f"  FIRST({symbol}) = {sorted(parser.first_sets[symbol])}")
+    if parser.load_cached_table():
+        print("\nLoaded compiled parsing table from cache, skipping table generation")
+    else:
+        # Step 1: Compute FIRST sets
+        print("\n1. COMPUTING FIRST SETS...")
+        parser.compute_first_sets()
+        print("FIRST sets computed:")
+        for symbol in parser.N:
+            print(f"  FIRST({symbol}) = {sorted(parser.first_sets[symbol])}")
     
-    # Step 2: Build canonical collection
-    print("\n2. BUILDING CANONICAL COLLECTION...")
-    parser.build_canonical_collection()
+        # Step 2: Build canonical collection
+        print("\n2. BUILDING CANONICAL COLLECTION...")
+        parser.build_canonical_collection()
     
-    # Step 3: Build parsing table
-    print("\n3. BUILDING PARSING TABLE...")
-    parser.build_parsing_table()
+        # Step 3: Build parsing table
+        print("\n3. BUILDING PARSING TABLE...")
+        parser.build_parsing_table()
     
-    # Step 4: Display the table
-    parser.display_parsing_table()
+        # Step 4: Display the table
+        parser.display_parsing_table()
+        
+        parser.save_cached_table()
     
     # Step 5: Test parsing
     print("\n4. TESTING PARSER...")
@@ -0,0 +1,101 @@
+import re
+
+# Terminals that stand for a class of lexemes instead of their own spelling.
+# 'a' is the identifier terminal of the expression grammars: identifiers and numbers both reduce F -> a.
+# Patterns must not contain capturing groups.
+TOKEN_PATTERNS = {
+    'a': r'[A-Za-z_][A-Za-z0-9_]*|[0-9]+(?:\.[0-9]+)?',
+}
+
+ERROR_TOKEN = -1  # kind of a character no terminal matches
+
+
+class Lexer:
+    """Tokenizer compiled from a terminal list into one regular expression
+
+    Every terminal becomes one group of the pattern, so the index of the group
+    that matched gives the terminal id. Whitespace is skipped and any other
+    character becomes an ERROR_TOKEN. tokens() yields
+    (terminal_id, lexeme, offset) tuples lazily and ends with the '$' token.
+    """
+
+    def __init__(self, terminals, token_patterns=None):
+        token_patterns = TOKEN_PATTERNS if token_patterns is None else token_patterns
+        self.terminals = list(terminals)
+        self.end_id = self.terminals.index('$')
+
+        groups = [(None, r'\s+')]  # whitespace, no token
+        literals = [t for t in self.terminals if t != '$' and t not in token_patterns]
+        # Longest literals first so that e.g. '**' wins over '*'
+        for t in sorted(literals, key=len, reverse=True):
+            pattern = re.escape(t)
+            if t[-1].isalnum() or t[-1] == '_':
+                pattern += r'(?![A-Za-z0-9_])'  # keyword-like literals must not cut identifiers
+            groups.append((self.terminals.index(t), pattern))
+        for t, pattern in token_patterns.items():
+            if t in self.terminals:
+                groups.append((self.terminals.index(t), pattern))
+
+        groups.append((ERROR_TOKEN, r'.'))  # any other character, so that every position matches
+
+        # Characters past a match the regex may need to see: literal prefixes ('*' of '**'),
+        # the digit after '.' in numbers and the identifier boundary of keyword-like literals.
+        # Other patterns (e.g. a grammar's %token num /[0-9]+(?:e[+-][0-9]+)?/) can need any
+        # number of them: None, and scan() holds back everything after the last whitespace.
+        self.lookahead = max(max(map(len, literals), default=1), 2)
+        if any(TOKEN_PATTERNS.get(t) != pattern for t, pattern in token_patterns.items() if t in self.terminals):
+            self.lookahead = None
+        self.regex = re.compile('|'.join(f'({pattern})' for kind, pattern in groups), re.DOTALL)
+        self.group_kinds = [None] + [kind for kind, pattern in groups]  # group index -> terminal id
+
+    def tokens(self, text, start=0):
+        """Yield (terminal_id, lexeme, offset) for text[start:], then the '$' token"""
+        group_kinds = self.group_kinds
+        for m in self.regex.finditer(text, start):
+            kind = group_kinds[m.lastindex]
+            if kind is not None:
+                yield kind, m.group(), m.start()
+        yield self.end_id, '', len(text)
+
+    def kinds(self, text):
+        """Terminal ids of text followed by the '$' id, without lexemes or offsets"""
+        group_kinds = self.group_kinds
+        kinds = [group_kinds[m.lastindex] for m in self.regex.finditer(text)]
+        kinds = [kind for kind in kinds if kind is not None]
+        kinds.append(self.end_id)
+        return kinds
+
+    def scan(self, text, final=True):
+        """Tokenize one chunk of a stream; returns (tokens, end)
+
+        Unless final is set, scanning stops at the first token that ends within
+        `lookahead` characters of the end of text, because the next chunk may still
+        change how it matches (e.g. '3' followed by '.5'); text[end:] has to be
+        carried over into the next call. With token patterns of unknown lookahead
+        it stops at the first token ending after the last whitespace instead, which
+        is exact as long as those patterns do not match whitespace. The '$' token is
+        only added when final is set.
+        """
+        group_kinds = self.group_kinds
+        tokens = []
+        length = len(text)
+        position = length
+        # Without final, only matches ending at or before `limit` are certain
+        if final:
+            limit = length
+        elif self.lookahead is not None:
+            limit = length - self.lookahead
+        else:
+            limit = length - 1
+            while limit >= 0 and not text[limit].isspace():
+                limit -= 1
+        for m in self.regex.finditer(text):
+            if m.end() > limit:
+                position = m.start()
+                break
+            kind = group_kinds[m.lastindex]
+            if kind is not None:
+                tokens.append((kind, m.group(), m.start()))
+        if final:
+            tokens.append((self.end_id, '', length))
+        return tokens, position
@@ -0,0 +1,304 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+
+# ACTION encoding (one signed int per entry):
+#   v > 0        shift and go to state v (state 0 is never a GOTO target)
+#   v == ACCEPT  accept, i.e. reduce by the augmented production 0
+#   v < ACCEPT   reduce by the production with dense id -v - 1
+#   v == ERROR   no action defined
+ERROR = 0
+ACCEPT = -1
+
+# On-disk table file: header, JSON metadata, then the raw array buffers (8-byte aligned)
+TABLE_MAGIC = b'LR1T'
+TABLE_FORMAT_VERSION = 2
+# Part of every grammar fingerprint: bump it when table construction changes what it
+# builds for the same grammar and options, so that cached tables are not reused
+GENERATOR_VERSION = 1
+TABLE_HEADER = struct.Struct('<4sI32sI')  # magic, format version, grammar fingerprint, metadata length
+TABLE_ARRAYS = ('action_base', 'action_next', 'action_check',
+                'goto_base', 'goto_next', 'goto_check', 'prod_lhs', 'prod_len')
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.lr1_cache')
+
+
+def current_umask():
+    """The process umask (reading it means setting it, so it is set back at once)"""
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+def grammar_fingerprint(N, T, S, P, *options):
+    """SHA-256 hex digest identifying the grammar G=(N,T,S,P), any construction options and the generator"""
+    key = repr((GENERATOR_VERSION, list(N), list(T), S, sorted(P.items()), options))
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def table_cache_path(fingerprint, cache_dir=None):
+    """Path of the cached table file for a grammar fingerprint"""
+    return os.path.join(cache_dir or DEFAULT_CACHE_DIR, f'{fingerprint[:32]}.lrt')
+
+
+def align8(offset):
+    return (offset + 7) & ~7
+
+
+def encode_reduce(prod_id):
+    """Encode a reduce by dense production id as an ACTION value"""
+    return -prod_id - 1
+
+
+def decode_reduce(action):
+    """Dense production id of a reduce ACTION value"""
+    return -action - 1
+
+
+def action_text(action, prod_nums):
+    """Classic spelling of an encoded ACTION given the production numbers by dense id"""
+    if action > 0:
+        return f's{action}'
+    if action == ACCEPT:
+        return 'acc'
+    if action:
+        return f'r{prod_nums[decode_reduce(action)]}'
+    return ''
+
+
+def pack_rows(rows, width, compress):
+    """Pack sparse rows {column: value} into (base, next, check) arrays
+
+    Entry (s, c) is next[base[s] + c] when check[base[s] + c] == s, otherwise 0.
+    Without compression every row gets its own slice of `width` cells; with
+    compression rows are overlapped by first-fit row displacement (comb packing),
+    trying only bases that put the first column of a row on a free cell.
+    """
+    n_rows = len(rows)
+    base = [0] * n_rows
+
+    if not compress:
+        next_ = [0] * (n_rows * width)
+        check = [-1] * (n_rows * width)
+        for s, row in enumerate(rows):
+            base[s] = s * width
+            for c, v in row.items():
+                next_[s * width + c] = v
+                check[s * width + c] = s
+    else:
+        next_ = []
+        check = []
+        # free[i] leads to the first free cell at or after i (union-find with path halving);
+        # cells at or past len(check) are free
+        free = []
+        occupied = 0  # bit i set when cell i is taken
+
+        def first_free(i):
+            while i < len(free) and free[i] != i:
+                free[i] = free[free[i]] if free[i] < len(free) else free[i]
+                i = free[i]
+            return i
+
+        # Densest rows first leave the gaps for the sparse ones
+        for s in sorted(range(n_rows), key=lambda r: -len(rows[r])):
+            row = rows[s]
+            if not row:
+                continue
+            first = min(row)
+            row_bits = 0
+            for c in row:
+                row_bits |= 1 << c
+            # Try the bases that put the first column on a free cell, lowest first
+            slot = first_free(first)
+            while (occupied >> (slot - first)) & row_bits:
+                slot = first_free(slot + 1)
+            b = slot - first
+            occupied |= row_bits << b
+            if len(check) < b + width:
+                grow = b + width - len(check)
+                free.extend(range(len(check), len(check) + grow))
+                next_.extend([0] * grow)
+                check.extend([-1] * grow)
+            for c, v in row.items():
+                next_[b + c] = v
+                check[b + c] = s
+                free[b + c] = b + c + 1
+            base[s] = b
+        # Any base + column must stay inside the arrays, including empty rows at base 0
+        padding = max(base, default=0) + width - len(check)
+        if padding > 0:
+            next_.extend([0] * padding)
+            check.extend([-1] * padding)
+
+    return array('i', base), array(typecode_for(next_), next_), array('i', check)
+
+
+def typecode_for(values):
+    """Smallest signed array typecode able to hold all values"""
+    if all(-2**15 <= v < 2**15 for v in values):
+        return 'h'
+    return 'i'
+
+
+class CompiledTable:
+    """Integer-encoded ACTION/GOTO tables backed by array buffers
+
+    Terminals (including '$') and non-terminals get dense ids in the order of
+    parser.T and parser.N; productions get dense ids in the order of augmented_P,
+    so the augmented production S' -> S is always id 0.
+    """
+
+    def __init__(self, terminals, nonterminals, productions, action_rows, goto_rows, compress=False):
+        self.set_symbols(terminals, nonterminals, [prod_num for prod_num, left, length in productions])
+        self.n_states = len(action_rows)
+        self.compressed = compress
+        # (state, terminal id) -> unit productions reduced before that ACTION entry, see UnitReductions
+        self.unit_chains = {}
+
+        # productions: list of (prod_num, left, rhs_length) indexed by dense id
+        self.prod_lhs = array('i', [self.nonterminal_ids.get(left, -1) for prod_num, left, length in productions])
+        self.prod_len = array('i', [length for prod_num, left, length in productions])
+
+        self.action_base, self.action_next, self.action_check = pack_rows(action_rows, len(self.terminals), compress)
+        self.goto_base, self.goto_next, self.goto_check = pack_rows(goto_rows, len(self.nonterminals), compress)
+
+    def set_symbols(self, terminals, nonterminals, prod_nums):
+        self.terminals = list(terminals)
+        self.nonterminals = list(nonterminals)
+        self.terminal_ids = {t: i for i, t in enumerate(self.terminals)}
+        self.nonterminal_ids = {nt: i for i, nt in enumerate(self.nonterminals)}
+        self.prod_nums = list(prod_nums)
+        self.prod_ids = {prod_num: i for i, prod_num in enumerate(self.prod_nums)}
+
+    @classmethod
+    def from_rows(cls, parser, action_rows, goto_rows, compress=False):
+        """Compile the ACTION/GOTO rows built by an LR1Parser/LR1Translator
+
+        action_rows[state] maps terminal ids (in the order of parser.T + ['$']) to
+        encoded actions, goto_rows[state] non-terminal ids (order of parser.N) to states.
+        """
+        productions = [(num, left, len(right)) for num, (left, right) in parser.augmented_P.items()]
+        return cls(parser.T + ['$'], parser.N, productions, action_rows, goto_rows, compress)
+
+    def action_text(self, action):
+        """Classic spelling of an encoded ACTION: 's3', 'r2' (production number), 'acc' or '' for an error"""
+        return action_text(action, self.prod_nums)
+
+    def text_rows(self):
+        """ACTION/GOTO as {symbol: 's3' | 'r2' | 'acc' | '4'} per state, for display; error entries are left out"""
+        rows = []
+        for state in range(self.n_states):
+            row = {}
+            for t, terminal in enumerate(self.terminals):
+                action = self.action(state, t)
+                if action:
+                    row[terminal] = self.action_text(action)
+            for nt, nonterminal in enumerate(self.nonterminals):
+                goto = self.goto(state, nt)
+                if goto:
+                    row[nonterminal] = str(goto)
+            rows.append(row)
+        return rows
+
+    def action(self, state, terminal_id):
+        """Encoded ACTION[state, terminal_id]"""
+        i = self.action_base[state] + terminal_id
+        return self.action_next[i] if self.action_check[i] == state else ERROR
+
+    def goto(self, state, nonterminal_id):
+        """GOTO[state, nonterminal_id], 0 when undefined"""
+        i = self.goto_base[state] + nonterminal_id
+        return self.goto_next[i] if self.goto_check[i] == state else 0
+
+    def nbytes(self):
+        """Total size of the table buffers in bytes"""
+        return sum(len(b) * b.itemsize for b in (getattr(self, name) for name in TABLE_ARRAYS))
+
+    def save(self, path, fingerprint):
+        """Write the table to a versioned binary file tagged with the grammar fingerprint
+
+        The file is written under a temporary name and renamed into place, so
+        concurrent readers never see a partially written table.
+        """
+        buffers = [getattr(self, name) for name in TABLE_ARRAYS]
+        meta = json.dumps({
+            'terminals': self.terminals,
+            'nonterminals': self.nonterminals,
+            'prod_nums': self.prod_nums,
+            'n_states': self.n_states,
+            'compressed': self.compressed,
+            'unit_chains': [[state, t, list(chain)] for (state, t), chain in self.unit_chains.items()],
+            'arrays': [[name, b.format if isinstance(b, memoryview) else b.typecode, len(b)]
+                       for name, b in zip(TABLE_ARRAYS, buffers)],
+        }).encode('utf-8')
+
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            # mkstemp creates the file 0600: let other users' worker processes map it too
+            os.fchmod(fd, 0o644 & ~current_umask())
+            with os.fdopen(fd, 'wb') as f:
+                f.write(TABLE_HEADER.pack(TABLE_MAGIC, TABLE_FORMAT_VERSION, bytes.fromhex(fingerprint), len(meta)))
+                f.write(meta)
+                offset = TABLE_HEADER.size + len(meta)
+                for b in buffers:
+                    f.write(b'\0' * (align8(offset) - offset))
+                    data = bytes(b)
+                    f.write(data)
+                    offset = align8(offset) + len(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path, fingerprint):
+        """Memory-map a table written by save(); None if missing, stale or not a table file
+
+        The array buffers are read-only views into the mapping, so processes
+        loading the same file share its pages.
+        """
+        try:
+            with open(path, 'rb') as f:
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        try:
+            magic, version, file_fingerprint, meta_length = TABLE_HEADER.unpack_from(mapping)
+            if (magic != TABLE_MAGIC or version != TABLE_FORMAT_VERSION
+                    or file_fingerprint != bytes.fromhex(fingerprint)):
+                mapping.close()
+                return None
+            meta = json.loads(mapping[TABLE_HEADER.size:TABLE_HEADER.size + meta_length])
+        except (struct.error, ValueError):
+            mapping.close()
+            return None
+
+        table = cls.__new__(cls)
+        table.set_symbols(meta['terminals'], meta['nonterminals'], meta['prod_nums'])
+        table.n_states = meta['n_states']
+        table.compressed = meta['compressed']
+        table.unit_chains = {(state, t): tuple(chain) for state, t, chain in meta['unit_chains']}
+
+        # Check the file holds every array before mapping any of them: a truncated
+        # file is regenerated instead of failing mid-parse
+        layout = []
+        offset = TABLE_HEADER.size + meta_length
+        for name, typecode, length in meta['arrays']:
+            offset = align8(offset)
+            nbytes = length * struct.calcsize(typecode)
+            layout.append((name, typecode, offset, nbytes))
+            offset += nbytes
+        if offset > len(mapping):
+            mapping.close()
+            return None
+
+        view = memoryview(mapping)
+        for name, typecode, offset, nbytes in layout:
+            setattr(table, name, view[offset:offset + nbytes].cast(typecode))
+        return table
@@ -0,0 +1,154 @@
+from collections import namedtuple
+
+from ParseTable import ACCEPT
+
+# One syntax error: character offset and lexeme of the offending token, the
+# terminals the parser expected there, and how parsing was resumed
+ParseError = namedtuple('ParseError', 'offset lexeme expected recovery')
+
+
+class ErrorRecovery:
+    """Table-driven error recovery over a CompiledTable: report every syntax error in one pass
+
+    The expected terminals of every state and the FOLLOW-based synchronization
+    points are precomputed once. On an error the parser first tries, if enabled,
+    the cheapest repair of at most max_cost token insertions/deletions after
+    which it accepts or shifts `check` more input tokens; otherwise it falls back
+    to panic mode: skip input until a token in FOLLOW(A) of some non-terminal A
+    that a state on the stack has a GOTO for, pop to that state and push the GOTO.
+    """
+
+    def __init__(self, table, lexer, follow_masks, max_cost=3, check=3):
+        """follow_masks[nonterminal id] is FOLLOW as a bitmask over the table's terminal ids"""
+        self.table = table
+        self.lexer = lexer
+        self.max_cost = max_cost
+        self.check = check
+        self.end_id = lexer.end_id
+        terminals = table.terminals
+        self.expected_ids = [tuple(t for t in range(len(terminals)) if table.action(state, t))
+                             for state in range(table.n_states)]
+        self.expected = [tuple(terminals[t] for t in ids) for ids in self.expected_ids]
+        # state -> [(GOTO state, FOLLOW mask of the non-terminal)]
+        self.sync = [[(table.goto(state, nt), follow_masks[nt])
+                      for nt in range(len(table.nonterminals)) if table.goto(state, nt)]
+                     for state in range(table.n_states)]
+
+    def step(self, stack, terminal_id):
+        """Run the reductions for terminal_id and shift it; the shifted state, ACCEPT or 0 on an error"""
+        table = self.table
+        if terminal_id < 0:
+            return 0
+        while True:
+            action = table.action(stack[-1], terminal_id)
+            if action >= 0 or action == ACCEPT:
+                if action > 0:
+                    stack.append(action)
+                return action
+            prod_id = -action - 1
+            rhs_length = table.prod_len[prod_id]
+            if rhs_length:
+                del stack[-rhs_length:]
+            stack.append(table.goto(stack[-1], table.prod_lhs[prod_id]))
+
+    def errors(self, text, repair=False):
+        """ParseError list of text, empty if it is valid"""
+        tokens = list(self.lexer.tokens(text))  # (terminal_id, lexeme, offset), ends with '$'
+        stack = [0]
+        pos = 0
+        errors = []
+        last_error_pos = None  # errors again at this token are cascades of the last one, not reported
+
+        while True:
+            terminal_id, lexeme, offset = tokens[pos]
+            result = self.step(stack, terminal_id)
+            if result == ACCEPT:
+                return errors
+            if result:
+                pos += 1
+                continue
+
+            # Syntax error at tokens[pos]
+            error = ParseError(offset, lexeme, self.expected[stack[-1]], None)
+            recovery = None
+            report = pos != last_error_pos
+            if not report:
+                # No token consumed since the last recovery: drop this one to make progress
+                if terminal_id != self.end_id:
+                    pos += 1
+                    recovery = f"deleted {lexeme!r}"
+            else:
+                if repair:
+                    fix = self.repair(stack, tokens, pos)
+                    if fix is not None:
+                        deleted, inserted = fix
+                        recovery = self.describe(tokens[pos:pos + deleted], inserted)
+                        tokens[pos:pos + deleted] = [(t, self.table.terminals[t], offset) for t in inserted]
+                if recovery is None:
+                    synced = self.synchronize(stack, tokens, pos)
+                    if synced is not None:
+                        recovery = f"skipped {synced - pos} token(s)" if synced > pos else "resynchronized"
+                        pos = synced
+            last_error_pos = pos
+            if report:
+                errors.append(error._replace(recovery=recovery or "gave up"))
+            if recovery is None:
+                return errors
+
+    def synchronize(self, stack, tokens, pos):
+        """Panic mode: position of the first token from pos on that some stacked state can resume with"""
+        for p in range(pos, len(tokens)):
+            terminal_id = tokens[p][0]
+            if terminal_id < 0:
+                continue
+            bit = 1 << terminal_id
+            for depth in range(len(stack) - 1, -1, -1):
+                for goto_state, follow in self.sync[stack[depth]]:
+                    if follow & bit and self.table.action(goto_state, terminal_id):
+                        del stack[depth + 1:]
+                        stack.append(goto_state)
+                        return p
+        return None
+
+    def repair(self, stack, tokens, pos):
+        """(deleted, inserted terminal ids) of the cheapest repair at pos, or None"""
+        for cost in range(1, self.max_cost + 1):
+            for deleted in range(cost + 1):
+                if pos + deleted >= len(tokens):  # '$' cannot be deleted
+                    break
+                inserted = self.find_insertion(list(stack), cost - deleted, tokens, pos + deleted)
+                if inserted is not None:
+                    return deleted, inserted
+        return None
+
+    def find_insertion(self, stack, count, tokens, resume):
+        """count terminals to insert before tokens[resume] so that parsing goes on, or None"""
+        if not count:
+            return [] if self.resumes(stack, tokens, resume) else None
+        for terminal_id in self.expected_ids[stack[-1]]:
+            if terminal_id == self.end_id:
+                continue
+            trial = list(stack)
+            if self.step(trial, terminal_id) > 0:
+                rest = self.find_insertion(trial, count - 1, tokens, resume)
+                if rest is not None:
+                    return [terminal_id] + rest
+        return None
+
+    def resumes(self, stack, tokens, resume):
+        """True if the parser accepts or shifts `check` tokens from tokens[resume] on"""
+        for terminal_id, lexeme, offset in tokens[resume:resume + self.check]:
+            result = self.step(stack, terminal_id)
+            if result == ACCEPT:
+                return True
+            if not result:
+                return False
+        return True
+
+    def describe(self, deleted_tokens, inserted):
+        parts = []
+        if inserted:
+            parts.append("inserted " + ' '.join(repr(self.table.terminals[t]) for t in inserted))
+        if deleted_tokens:
+            parts.append("deleted " + ' '.join(repr(lexeme) for t, lexeme, offset in deleted_tokens))
+        return ', '.join(parts)
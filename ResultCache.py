@@ -0,0 +1,58 @@
+from collections import OrderedDict
+
+MISSING = object()
+
+
+class LRUCache:
+    """Bounded mapping that evicts the least recently used entry, with hit/miss counters
+
+    Used by LR1Parser.parse_input and LR1Translator.translate_input to skip the
+    LR loop for inputs seen before; keys carry the table fingerprint, so one
+    cache can be shared between parsers of different grammars. Values must be
+    immutable (bools, tuples of IR.Quad), since every hit returns the same object.
+    """
+
+    def __init__(self, maxsize=4096):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        """Cached value of key (now the most recently used), or default on a miss"""
+        value = self.entries.get(key, MISSING)
+        if value is MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Drop all entries and reset the counters"""
+        self.entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,125 @@
+from FirstFollow import bits_of, mask_symbols
+from Items import merge_states
+
+
+def lr0_core(state):
+    """LR(0) core of an LR(1) state: its core ids without lookaheads"""
+    return state[0]
+
+
+def reduce_conflicts(itemset, cores, terminals):
+    """Reduce/reduce conflicts of an itemset as {lookahead: frozenset of prod_nums}"""
+    completed = [(cores.prod[core], mask) for core, mask in zip(*itemset) if cores.next_symbol[core] is None]
+    seen = 0
+    shared = 0  # lookaheads of more than one completed item
+    for prod_num, mask in completed:
+        shared |= seen & mask
+        seen |= mask
+    return {la: frozenset(prod_num for prod_num, mask in completed if mask & bit)
+            for la, bit in zip(mask_symbols(shared, terminals), bits_of(shared))}
+
+
+def merge_lr0_cores(itemsets, transitions, cores, terminals):
+    """Merge LR(1) states with identical LR(0) cores (LALR(1) construction)
+
+    Returns (merged_itemsets, merged_transitions, merged_of, new_conflicts) where
+    merged_of[i] is the merged state of canonical state i and new_conflicts lists
+    (state, lookahead, prod_nums) reduce/reduce conflicts that none of the merged
+    LR(1) states had on their own. State 0 keeps index 0.
+    """
+    state_of_core = {}
+    merged_itemsets = []
+    merged_of = []
+    for itemset in itemsets:
+        core = lr0_core(itemset)
+        j = state_of_core.get(core)
+        if j is None:
+            j = len(merged_itemsets)
+            state_of_core[core] = j
+            merged_itemsets.append(itemset)
+        else:
+            merged_itemsets[j] = merge_states(merged_itemsets[j], itemset)
+        merged_of.append(j)
+
+    merged_transitions = [{} for _ in merged_itemsets]
+    for i, row in enumerate(transitions):
+        for symbol, target in row.items():
+            merged_transitions[merged_of[i]][symbol] = merged_of[target]
+
+    # Conflicts the canonical states already had are not caused by merging
+    old_conflicts = [set() for _ in merged_itemsets]
+    for i, itemset in enumerate(itemsets):
+        old_conflicts[merged_of[i]].update(reduce_conflicts(itemset, cores, terminals).items())
+
+    new_conflicts = []
+    for j, itemset in enumerate(merged_itemsets):
+        for lookahead, prods in sorted(reduce_conflicts(itemset, cores, terminals).items()):
+            if (lookahead, prods) not in old_conflicts[j]:
+                new_conflicts.append((j, lookahead, sorted(prods)))
+
+    return merged_itemsets, merged_transitions, merged_of, new_conflicts
+
+
+def weakly_compatible(kernel_a, kernel_b):
+    """Pager's weak compatibility test for two kernels with the same LR(0) core
+
+    Merging weakly compatible kernels cannot create a reduce/reduce conflict that
+    canonical LR(1) would not have, so the merged automaton keeps LR(1) power.
+    Lookaheads are the masks of the two states, aligned core by core.
+    """
+    masks_a, masks_b = kernel_a[1], kernel_b[1]
+    for x in range(len(masks_a)):
+        a_i, b_i = masks_a[x], masks_b[x]
+        for y in range(x + 1, len(masks_a)):
+            a_j, b_j = masks_a[y], masks_b[y]
+            if (a_i & b_j or b_i & a_j) and not (a_i & a_j or b_i & b_j):
+                return False
+    return True
+
+
+class WeakCompatibilityMerger:
+    """State lookup for Pager's construction: reuse a state whose kernel is weakly compatible"""
+
+    def __init__(self):
+        self.states_of_core = {}  # LR(0) core -> state indices with that core
+        self.kernel_of = {}  # state index -> current (possibly grown) kernel
+        self.merges = 0
+
+    def add(self, idx, kernel):
+        self.states_of_core.setdefault(lr0_core(kernel), []).append(idx)
+        self.kernel_of[idx] = kernel
+
+    def find(self, kernel):
+        """(state index, grown kernel) for a compatible state, or (None, None)
+
+        The grown kernel is None when the state already covers the lookaheads of
+        `kernel`; otherwise the caller has to recompute its closure and successors.
+        """
+        for idx in self.states_of_core.get(lr0_core(kernel), ()):
+            old_kernel = self.kernel_of[idx]
+            if weakly_compatible(old_kernel, kernel):
+                self.merges += 1
+                merged = merge_states(old_kernel, kernel)
+                if merged == old_kernel:
+                    return idx, None
+                self.kernel_of[idx] = merged
+                return idx, merged
+        return None, None
+
+
+def prune_unreachable(itemsets, transitions, kernels):
+    """Drop states no longer reachable from state 0 and renumber the rest in order"""
+    reachable = {0}
+    stack = [0]
+    while stack:
+        for target in transitions[stack.pop()].values():
+            if target not in reachable:
+                reachable.add(target)
+                stack.append(target)
+
+    order = sorted(reachable)
+    new_id = {old: i for i, old in enumerate(order)}
+    itemsets = [itemsets[old] for old in order]
+    transitions = [{symbol: new_id[target] for symbol, target in transitions[old].items()} for old in order]
+    kernels = {kernel: new_id[idx] for kernel, idx in kernels.items() if idx in new_id}
+    return itemsets, transitions, kernels
@@ -0,0 +1,113 @@
+import json
+import time
+
+from Streaming import PushParser
+
+COUNTERS = (
+    'closure_calls',  # closures computed during construction
+    'closure_items',  # items (core, lookahead mask) in those closures
+    'goto_lookups',  # GOTO kernels looked up in the state registry
+    'goto_hits',  # ... of which an existing state was found
+    'states_created',
+    'conflicts',  # table entries with two different actions
+    'parses',
+    'accepted',
+    'shifts',
+    'reduces',
+)
+GAUGES = ('max_stack_depth',)
+
+
+class EngineStats:
+    """Opt-in counters of an LR1Parser/LR1Translator, set as its `stats` attribute
+
+    With stats = None (the default) the engines skip all of this. With stats
+    set, parse_input/translate_input run on a ProfilingParser instead of the
+    fast loop and bypass the result cache. seconds holds the wall time per
+    phase: first_sets, collection, table and parse or translate.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        for name in COUNTERS + GAUGES:
+            setattr(self, name, 0)
+        self.reduces_by_production = {}  # production number -> reductions
+        self.seconds = {}  # phase -> accumulated wall time
+
+    def add_time(self, phase, seconds):
+        self.seconds[phase] = self.seconds.get(phase, 0.0) + seconds
+
+    def as_dict(self):
+        stats = {name: getattr(self, name) for name in COUNTERS + GAUGES}
+        stats['reduces_by_production'] = dict(sorted(self.reduces_by_production.items()))
+        stats['seconds'] = dict(self.seconds)
+        return stats
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.as_dict(), **kwargs)
+
+    def to_prometheus(self, prefix='lr1'):
+        """Prometheus text exposition format"""
+        lines = []
+        for name in COUNTERS:
+            lines.append(f'# TYPE {prefix}_{name}_total counter')
+            lines.append(f'{prefix}_{name}_total {getattr(self, name)}')
+        for name in GAUGES:
+            lines.append(f'# TYPE {prefix}_{name} gauge')
+            lines.append(f'{prefix}_{name} {getattr(self, name)}')
+        lines.append(f'# TYPE {prefix}_reduces_by_production_total counter')
+        for prod_num, count in sorted(self.reduces_by_production.items()):
+            lines.append(f'{prefix}_reduces_by_production_total{{production="{prod_num}"}} {count}')
+        lines.append(f'# TYPE {prefix}_phase_seconds_total counter')
+        for phase, seconds in self.seconds.items():
+            lines.append(f'{prefix}_phase_seconds_total{{phase="{phase}"}} {seconds!r}')
+        return '\n'.join(lines) + '\n'
+
+
+class ProfilingMixin:
+    """on_shift/on_reduce hooks counting into self.stats; list it before a PushParser class"""
+
+    stats = None
+
+    def on_shift(self, terminal_id, lexeme):
+        super().on_shift(terminal_id, lexeme)
+        stats = self.stats
+        stats.shifts += 1
+        if len(self.stack) > stats.max_stack_depth:
+            stats.max_stack_depth = len(self.stack)
+
+    def on_reduce(self, prod_id):
+        super().on_reduce(prod_id)
+        stats = self.stats
+        stats.reduces += 1
+        prod_num = self.table.prod_nums[prod_id]
+        stats.reduces_by_production[prod_num] = stats.reduces_by_production.get(prod_num, 0) + 1
+        if len(self.stack) > stats.max_stack_depth:
+            stats.max_stack_depth = len(self.stack)
+
+    def on_unit_reductions(self, prod_ids):
+        super().on_unit_reductions(prod_ids)
+        stats = self.stats
+        stats.reduces += len(prod_ids)
+        for prod_id in prod_ids:
+            prod_num = self.table.prod_nums[prod_id]
+            stats.reduces_by_production[prod_num] = stats.reduces_by_production.get(prod_num, 0) + 1
+
+
+class ProfilingParser(ProfilingMixin, PushParser):
+    pass
+
+
+def profile_run(parser, stats, input_string, phase):
+    """Run a profiling push parser over a whole input; True if it was accepted"""
+    start = time.perf_counter()
+    parser.stats = stats
+    parser.feed(input_string)
+    accepted = parser.finish()
+    stats.add_time(phase, time.perf_counter() - start)
+    stats.parses += 1
+    if accepted:
+        stats.accepted += 1
+    return accepted
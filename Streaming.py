@@ -0,0 +1,99 @@
+import codecs
+
+from ParseTable import ACCEPT, decode_reduce
+
+
+class PushParser:
+    """Push-style LR recognizer over a CompiledTable
+
+    Input arrives through feed() in chunks of str or bytes (UTF-8), which may split
+    a token anywhere; finish() marks the end of input. The state stack survives
+    between calls, and only the unfinished tail of the last chunk is buffered.
+    result is None while undecided, then True (accepted) or False (syntax error
+    at error_offset, counted in characters from the start of the stream).
+    """
+
+    def __init__(self, table, lexer):
+        self.table = table
+        self.lexer = lexer
+        self.stack = [0]
+        self.buffer = ''
+        self.consumed = 0  # stream offset of buffer[0]
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.result = None
+        self.error_offset = None
+
+    def feed(self, chunk):
+        """Consume the next chunk of input; returns result"""
+        if isinstance(chunk, (bytes, bytearray)):
+            chunk = self.decoder.decode(chunk)
+        return self.consume(chunk, final=False)
+
+    def finish(self):
+        """Signal end of input; returns True if the input was accepted"""
+        return self.consume(self.decoder.decode(b'', final=True), final=True)
+
+    def consume(self, text, final):
+        if self.result is not None:
+            return self.result
+        self.buffer += text
+        tokens, end = self.lexer.scan(self.buffer, final)
+        for terminal_id, lexeme, offset in tokens:
+            if not self.push_token(terminal_id, lexeme, offset):
+                break
+        self.consumed += end
+        self.buffer = self.buffer[end:]
+        return self.result
+
+    def push_token(self, terminal_id, lexeme, offset):
+        """Run the reductions triggered by one token and shift it; False once parsing has ended"""
+        table = self.table
+        stack = self.stack
+        action_base, action_next, action_check = table.action_base, table.action_next, table.action_check
+        goto_base, goto_next = table.goto_base, table.goto_next
+        prod_len, prod_lhs = table.prod_len, table.prod_lhs
+        unit_chains = table.unit_chains
+
+        while True:
+            current_state = stack[-1]
+            action = 0
+            if terminal_id >= 0:
+                i = action_base[current_state] + terminal_id
+                if action_check[i] == current_state:
+                    action = action_next[i]
+
+            if not action:
+                self.result = False
+                self.error_offset = self.consumed + offset
+                return False
+
+            if unit_chains:
+                chain = unit_chains.get((current_state, terminal_id))
+                if chain:
+                    self.on_unit_reductions(chain)
+
+            if action == ACCEPT:
+                self.result = True
+                return False
+
+            if action > 0:  # Shift
+                stack.append(action)
+                self.on_shift(terminal_id, lexeme)
+                return True
+
+            # Reduce
+            prod_id = decode_reduce(action)
+            rhs_length = prod_len[prod_id]
+            if rhs_length:
+                del stack[-rhs_length:]
+            stack.append(goto_next[goto_base[stack[-1]] + prod_lhs[prod_id]])
+            self.on_reduce(prod_id)
+
+    def on_shift(self, terminal_id, lexeme):
+        """Hook for subclasses, called after a token is shifted"""
+
+    def on_reduce(self, prod_id):
+        """Hook for subclasses, called after a reduction by dense production id"""
+
+    def on_unit_reductions(self, prod_ids):
+        """Hook for subclasses, called with the unit reductions a bypassed table skips (table.unit_chains)"""
@@ -0,0 +1,162 @@
+import json
+import sys
+
+from Grammar import format_right
+
+
+class Tracer:
+    """Observer of table construction and parsing; every hook is a no-op
+
+    Parsers keep `tracer = None` by default and skip all trace work, including
+    building the arguments of these calls; subclasses override the hooks they need.
+    """
+
+    def state(self, index, items):
+        """A state of the collection is processed; items are (left, right, dot_pos, lookahead)"""
+
+    def collection_done(self, n_states):
+        """The collection of item sets is complete"""
+
+    def merge(self, report):
+        """States were merged (LALR or Pager construction); see LR1Engine.merge_report"""
+
+    def table_start(self):
+        """Filling of ACTION/GOTO starts"""
+
+    def table_entry(self, state, symbol, kind, entry, production=None):
+        """kind is 'action' or 'goto'; production is (left, right) for reduce entries"""
+
+    def conflict(self, state, symbol, current, proposed):
+        """Two actions for one table entry; the current one is kept"""
+
+    def resolved(self, state, symbol, shift, reduce, winner):
+        """A shift/reduce conflict settled by precedence; winner is 'shift', 'reduce' or 'error'"""
+
+    def parse_start(self, input_string):
+        """parse_input starts"""
+
+    def parse_step(self, step, stack, remaining, action, argument=None):
+        """One parser step; action is 'shift', 'reduce', 'accept' or 'error'"""
+
+
+class TextTracer(Tracer):
+    """Human-readable trace, the format LR1.py has always printed"""
+
+    def __init__(self, out=None):
+        self.out = out or sys.stdout
+
+    def write(self, text):
+        print(text, file=self.out)
+
+    def state(self, index, items):
+        self.write(f"\nProcessing I{index} ({len(items)} items):")
+        for left, right, dot_pos, lookahead in items:
+            symbols = list(right)
+            dotted_right = ' '.join(symbols[:dot_pos] + ['.'] + symbols[dot_pos:])
+            self.write(f"  [{left} -> {dotted_right}, {lookahead}]")
+
+    def collection_done(self, n_states):
+        self.write(f"\nCanonical collection complete: {n_states} states generated")
+
+    def merge(self, report):
+        if 'lr1_states' in report:
+            self.write(f"LALR(1) merge: {report['lr1_states']} -> {report['states']} states")
+        else:
+            self.write(f"Pager merge: {report['generated_states']} -> {report['states']} states, "
+                       f"{report['merges']} merges")
+        for state, lookahead, prods in report['new_conflicts']:
+            self.write(f"    NEW REDUCE/REDUCE CONFLICT at I{state},{lookahead}: {', '.join(f'r{p}' for p in prods)}")
+
+    def table_start(self):
+        self.write("\nBuilding LR(1) parsing table...")
+
+    def table_entry(self, state, symbol, kind, entry, production=None):
+        if kind == 'goto':
+            self.write(f"    GOTO[{state},{symbol}] = {entry}")
+        elif production is not None:
+            left, right = production
+            self.write(f"    ACTION[{state},{symbol}] = {entry} (reduce by {left}->{format_right(right)})")
+        else:
+            self.write(f"    ACTION[{state},{symbol}] = {entry}")
+
+    def conflict(self, state, symbol, current, proposed):
+        self.write(f"    REDUCE CONFLICT at I{state},{symbol}: {current} vs {proposed}")
+
+    def resolved(self, state, symbol, shift, reduce, winner):
+        self.write(f"    SHIFT/REDUCE CONFLICT at I{state},{symbol}: {shift} vs {reduce}, {winner} by precedence")
+
+    def parse_start(self, input_string):
+        self.write(f"\nParsing input: {input_string}")
+        self.write(f"{'Step':<4} {'Stack':<30} {'Input':<20} {'Action':<10}")
+        self.write("-" * 70)
+
+    def parse_step(self, step, stack, remaining, action, argument=None):
+        row = f"{step:<4} {str(stack):<30} {remaining:<20}"
+        if action == 'shift':
+            self.write(row + f"shift {argument:<4}")
+        elif action == 'reduce':
+            self.write(row + f"reduce {argument:<3}")
+        elif action == 'accept':
+            self.write(row + f"{'ACCEPT':<10}")
+            self.write("Input successfully parsed!")
+        else:
+            self.write(row + f"{'ERROR':<10}")
+            self.write("No action defined - parsing failed!")
+
+
+class RecordTracer(Tracer):
+    """Turns every hook into a flat dict record passed to record()"""
+
+    def record(self, record):
+        """One event as a JSON-serializable dict with an 'event' key; a no-op, subclasses store or emit it"""
+
+    def state(self, index, items):
+        self.record({'event': 'state', 'state': index,
+                     'items': [[left, ' '.join(right), dot_pos, lookahead] for left, right, dot_pos, lookahead in items]})
+
+    def collection_done(self, n_states):
+        self.record({'event': 'collection_done', 'states': n_states})
+
+    def merge(self, report):
+        self.record(dict(report, event='merge'))
+
+    def table_start(self):
+        self.record({'event': 'table_start'})
+
+    def table_entry(self, state, symbol, kind, entry, production=None):
+        self.record({'event': 'table_entry', 'state': state, 'symbol': symbol, 'kind': kind, 'entry': entry})
+
+    def conflict(self, state, symbol, current, proposed):
+        self.record({'event': 'conflict', 'state': state, 'symbol': symbol,
+                     'current': current, 'proposed': proposed})
+
+    def resolved(self, state, symbol, shift, reduce, winner):
+        self.record({'event': 'resolved', 'state': state, 'symbol': symbol,
+                     'shift': shift, 'reduce': reduce, 'winner': winner})
+
+    def parse_start(self, input_string):
+        self.record({'event': 'parse_start', 'input': input_string})
+
+    def parse_step(self, step, stack, remaining, action, argument=None):
+        self.record({'event': 'parse_step', 'step': step, 'stack': list(stack),
+                     'input': remaining, 'action': action, 'argument': argument})
+
+
+class JsonTracer(RecordTracer):
+    """One JSON object per line for every event"""
+
+    def __init__(self, out=None):
+        self.out = out or sys.stdout
+
+    def record(self, record):
+        self.out.write(json.dumps(record) + '\n')
+
+
+class ListTracer(RecordTracer):
+    """Keeps the records in memory, e.g. for tests or for rendering a trace later"""
+
+    def __init__(self):
+        self.records = []
+
+    def record(self, record):
+        self.records.append(record)
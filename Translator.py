@@ -1,10 +1,94 @@
-class LR1Translator:
+import sys
+from functools import partial
+from types import MethodType
+
+from Batch import run_batch, translate_indexed, translate_one
+from Engine import LR1Engine
+from Evaluate import compile_quads
+from IR import Quad, optimize
+from ParseTable import ACCEPT
+from Stats import ProfilingMixin, profile_run
+from Streaming import PushParser
+from UnitReductions import unit_productions
+
+
+# Semantic actions by production (left, right tuple); each pops the attributes of
+# the right side from attr_stack and pushes the attribute of the left side
+SEMANTIC_ACTIONS = {}
+
+
+def semantic_action(left, right, registry=SEMANTIC_ACTIONS):
+    """Decorator registering func(translator, attr_stack) as the action of left -> right"""
+    def register(func):
+        registry[(left, tuple(right))] = func
+        return func
+    return register
+
+
+def emit_binary(operator, translator, attr_stack):
+    right_val = attr_stack.pop()
+    left_val = attr_stack.pop()
+    attr_stack.append(translator.emit(operator, left_val, right_val))
+
+
+def binary_operation(operator):
+    """Action of X -> X op Y: t := x op y (a partial, so it pickles into batch workers)"""
+    return partial(emit_binary, operator)
+
+
+for production, operator in ((('E', 'E+T'), '+'), (('E', 'E-T'), '-'),
+                             (('T', 'T*F'), '*'), (('T', 'T/F'), '/'),
+                             # flat grammar with precedence declarations, see gramatica_precedenta.txt
+                             (('E', 'E+E'), '+'), (('E', 'E-E'), '-'),
+                             (('E', 'E*E'), '*'), (('E', 'E/E'), '/')):
+    semantic_action(*production)(binary_operation(operator))
+
+
+@semantic_action('F', '-(E)')
+@semantic_action('E', '-E')
+def unary_minus(translator, attr_stack):
+    e_val = attr_stack.pop()
+    attr_stack.append(translator.emit('uminus', e_val))
+
+
+# E -> T, T -> F, F -> (E) and F -> a copy their attribute: no action
+
+
+# Shift actions by terminal; each pushes the attribute of a shifted lexeme onto attr_stack.
+# Terminals without one (operators, parentheses) push nothing.
+SHIFT_ACTIONS = {}
+
+
+def shift_action(terminal, registry=SHIFT_ACTIONS):
+    """Decorator registering func(translator, attr_stack, lexeme) as the action of shifting terminal"""
+    def register(func):
+        registry[terminal] = func
+        return func
+    return register
+
+
+@shift_action('a')
+def identifier(translator, attr_stack, lexeme):
+    """The lexeme is the operand, so equal identifiers are equal operands for CSE and compile_input"""
+    if translator.number_identifiers and lexeme == 'a':
+        # Demo: number the placeholder identifier a1, a2, ... as in the trace below
+        translator.identifier_counter += 1
+        lexeme = f"a{translator.identifier_counter}"
+    attr_stack.append(sys.intern(lexeme))
+
+
+def push_lexeme(translator, attr_stack, lexeme):
+    """Shift action of operand terminals like 'id' or 'num': the lexeme is the attribute"""
+    attr_stack.append(sys.intern(lexeme))
+
+
+class LR1Translator(LR1Engine):
     def __init__(self):
-        self.N = ['E', 'T', 'F'] 
-        self.T = ['a', '+', '-', '*', '/', '(', ')']
-        self.S = 'E'
+        N = ['E', 'T', 'F'] 
+        T = ['a', '+', '-', '*', '/', '(', ')']
+        S = 'E'
         
-        self.P = {
+        P = {
             1: ('E', 'E+T'),
             11: ('E', 'E-T'),
             2: ('E', 'T'), 
@@ -16,299 +100,255 @@ class LR1Translator:
             51: ('F', '-(E)')
         }
         
-        self.augmented_P = {0: ("S'", 'E')}
-        self.augmented_P.update(self.P)
-        
-        self.itemsets = []
-        self.parsing_table = {}
-        self.first_sets = {}
+        super().__init__(N, T, S, P)
         
         self.temp_counter = 0
-        self.intermediate_code = []
+        self.intermediate_code = []  # IR.Quad list emit() appends to during a translation
+        self.result = None  # operand holding the value of the last translation
+        self.optimize_code = False  # run IR.optimize on the code of translate_input
+        self.semantic_actions = dict(SEMANTIC_ACTIONS)  # (left, right) -> action(translator, attr_stack)
+        self.reduce_actions = []  # dense production id -> bound action or None, see resolve_actions
+        self.shift_actions = dict(SHIFT_ACTIONS)  # terminal -> action(translator, attr_stack, lexeme)
+        self.terminal_actions = []  # terminal id -> bound shift action or None
+        self.number_identifiers = False  # translate each bare 'a' to a fresh a1, a2, ... (the demo in main)
+        self.identifier_counter = 0  # placeholder identifiers 'a' numbered so far in this translation
         
     def newtemp(self):
         """Generate a new temporary variable"""
         self.temp_counter += 1
-        return f"t{self.temp_counter}"
+        return sys.intern(f"t{self.temp_counter}")
     
-    def emit(self, code):
-        """Emit intermediate code"""
-        self.intermediate_code.append(code)
+    def emit(self, op, arg1, arg2=None):
+        """Emit the quadruple newtemp := arg1 op arg2 and return the new temporary"""
+        result = self.newtemp()
+        self.intermediate_code.append(Quad(result, op, arg1, arg2))
+        return result
     
-    def compute_first_sets(self):
-        for nt in self.N:
-            self.first_sets[nt] = set()
-        for t in self.T:
-            self.first_sets[t] = {t}
-        
-        self.first_sets['ε'] = {'ε'}
+    def load_grammar(self, path, actions=None, shift_actions=None):
+        """Replace the grammar by the one in a grammar file
         
-        changed = True
-        while changed:
-            changed = False
-            for prod_num, (left, right) in self.P.items():
-                symbols = list(right)
-                
-                for symbol in symbols:
-                    if symbol in self.T:
-                        if symbol not in self.first_sets[left]:
-                            self.first_sets[left].add(symbol)
-                            changed = True
-                        break
-                    else:
-                        first_of_symbol = self.first_sets.get(symbol, set())
-                        new_terminals = first_of_symbol - self.first_sets[left]
-                        if new_terminals:
-                            self.first_sets[left].update(new_terminals)
-                            changed = True
-                        if 'ε' not in first_of_symbol:
-                            break
+        Semantic actions are looked up by production, so the ones of SEMANTIC_ACTIONS
+        carry over to equal productions; actions maps further (left, right) pairs to
+        their actions. Likewise shift_actions maps terminals to the actions that push
+        their attributes (e.g. {'id': push_lexeme, 'num': push_lexeme}).
+        """
+        super().load_grammar(path)
+        if actions:
+            for (left, right), func in actions.items():
+                self.set_action(left, right, func)
+        if shift_actions:
+            for terminal, func in shift_actions.items():
+                self.set_shift_action(terminal, func)
     
-    def first_of_string(self, string, lookahead):
-        if not string:
-            return {lookahead}
-        
-        result = set()
-        all_epsilon = True
-        
-        for symbol in string:
-            if symbol in self.T:
-                result.add(symbol)
-                all_epsilon = False
-                break
-            else:
-                first = self.first_sets.get(symbol, set())
-                if 'ε' in first:
-                    first = first - {'ε'}
-                result.update(first)
-                if 'ε' not in self.first_sets.get(symbol, set()):
-                    all_epsilon = False
-                    break
-        
-        if all_epsilon:
-            result.add(lookahead)
-            
-        return result
+    def set_compiled_table(self, table):
+        self.reduce_actions = self.resolve_actions(table)
+        self.terminal_actions = [MethodType(func, self) if func is not None else None
+                                 for func in map(self.shift_actions.get, table.terminals)]
+        super().set_compiled_table(table)
     
-    def closure(self, items):
-        closure_set = set(items)
-        changed = True
-        
-        while changed:
-            changed = False
-            new_items = set()
-            
-            for item in list(closure_set):
-                prod_num, dot_pos, lookahead = item
-                left, right = self.augmented_P[prod_num]
-                symbols = list(right)
-                
-                if dot_pos >= len(symbols):
-                    continue
-                
-                next_symbol = symbols[dot_pos]
-                
-                if next_symbol in self.N:
-                    remaining_symbols = symbols[dot_pos + 1:]
-                    lookaheads = self.first_of_string(remaining_symbols, lookahead)
-                    
-                    for new_prod_num, (new_left, new_right) in self.augmented_P.items():
-                        if new_left == next_symbol:
-                            for la in lookaheads:
-                                new_item = (new_prod_num, 0, la)
-                                if new_item not in closure_set and new_item not in new_items:
-                                    new_items.add(new_item)
-                                    changed = True
-            
-            closure_set.update(new_items)
+    def bypassed_unit_productions(self, table):
+        """Only unit productions without a semantic action are bypassed, so the code is unchanged"""
+        actions = self.resolve_actions(table)
+        return unit_productions(table, lambda prod_id: actions[prod_id] is not None)
+    
+    def set_action(self, left, right, func):
+        """Attach func(translator, attr_stack) to production left -> right; applies from the next set_compiled_table"""
+        self.semantic_actions[(left, tuple(right))] = func
+    
+    def worker_settings(self):
+        """Attributes that Batch.init_worker copies onto the translator of every worker"""
+        return {**super().worker_settings(), 'semantic_actions': self.semantic_actions,
+                'shift_actions': self.shift_actions, 'optimize_code': self.optimize_code,
+                'number_identifiers': self.number_identifiers}
+    
+    def set_shift_action(self, terminal, func):
+        """Attach func(translator, attr_stack, lexeme) to shifts of terminal; applies from the next set_compiled_table"""
+        self.shift_actions[terminal] = func
+    
+    def resolve_actions(self, table):
+        """Semantic action per dense production id of table, bound to this translator
         
-        return closure_set
+        Productions without a registered action (copy rules like E -> T) get None
+        and leave the attribute stack unchanged.
+        """
+        actions = []
+        for prod_num in table.prod_nums:
+            func = self.semantic_actions.get((self.augmented_P[prod_num][0], self.rhs[prod_num]))
+            actions.append(MethodType(func, self) if func is not None else None)
+        return actions
     
-    def goto(self, itemset, symbol):
-        """Compute GOTO for an itemset and symbol"""
-        new_items = set()
+    def compile_input(self, input_string):
+        """Translate input_string into a Python function formula(env), None on a syntax error
         
-        for item in itemset:
-            prod_num, dot_pos, lookahead = item
-            left, right = self.augmented_P[prod_num]
-            symbols = list(right)
-            
-            if dot_pos < len(symbols) and symbols[dot_pos] == symbol:
-                new_item = (prod_num, dot_pos + 1, lookahead)
-                new_items.add(new_item)
+        The optimized code is compiled to bytecode once (see Evaluate.compile_quads);
+        the function then evaluates against a binding of its variables or, with
+        NumPy arrays as values, against a whole column batch at once.
+        """
+        # Optimize the translator's own code: the output of optimize_code or of a
+        # cached optimized translation reuses temporaries already
+        optimize_code, self.optimize_code = self.optimize_code, False
+        try:
+            code = self.run_translation(input_string)
+        finally:
+            self.optimize_code = optimize_code
+        if code is None:
+            return None
+        code, result = optimize(code, self.result)
+        return compile_quads(code, result, input_string)
+    
+    def push_translator(self):
+        """Push-style translator fed with input chunks; see LR1PushTranslator"""
+        return LR1PushTranslator(self)
+    
+    def translate_many(self, inputs, processes=None, chunksize=64, ordered=True, cache_dir=None):
+        """Translate every input on a process pool sharing the memory-mapped table
         
-        return self.closure(new_items) if new_items else set()
+        Yields the code (or None) per input in order, or (index, code) pairs as
+        they complete when ordered is False.
+        """
+        return run_batch(self, translate_one, translate_indexed, inputs, processes, chunksize, ordered, cache_dir)
     
-    def build_canonical_collection(self):
-        initial_item = (0, 0, '$')
-        I0 = self.closure({initial_item})
-        self.itemsets = [I0]
+    def translate_input(self, input_string):
+        """Translate input string to intermediate code, a tuple of IR.Quad (None on a syntax error)
         
-        queue = [0]
-        processed = set()
+        The value of the input ends up in self.result. With optimize_code the
+        code goes through IR.optimize (CSE, constant folding, dead temporaries,
+        temporary reuse). With a result_cache, repeated inputs return the cached
+        code; clear the cache after changing semantic actions.
+        """
+        if self.stats is not None:
+            return self.profile_translation(input_string)
         
-        while queue:
-            current_idx = queue.pop(0)
-            if current_idx in processed:
-                continue
-            processed.add(current_idx)
-            
-            current_itemset = self.itemsets[current_idx]
-            all_symbols = self.T + self.N
-            
-            for symbol in all_symbols:
-                goto_set = self.goto(current_itemset, symbol)
-                
-                if goto_set:
-                    found_idx = -1
-                    for idx, existing_set in enumerate(self.itemsets):
-                        if existing_set == goto_set:
-                            found_idx = idx
-                            break
-                    
-                    if found_idx == -1:
-                        found_idx = len(self.itemsets)
-                        self.itemsets.append(goto_set)
-                        queue.append(found_idx)
+        cache = self.result_cache
+        if cache is None:
+            return self.run_translation(input_string)
+        key = (self.table_key, self.optimize_code, self.number_identifiers, input_string)
+        entry = cache.get(key)
+        if entry is None:
+            entry = (self.run_translation(input_string), self.result)
+            cache.put(key, entry)
+        code, self.result = entry
+        return code
     
-    def build_parsing_table(self):
-        for i in range(len(self.itemsets)):
-            self.parsing_table[i] = {}
-            for terminal in self.T + ['$']:
-                self.parsing_table[i][terminal] = ''
-            for non_terminal in self.N:
-                self.parsing_table[i][non_terminal] = ''
-        
-        for i, itemset in enumerate(self.itemsets):
-            for item in itemset:
-                prod_num, dot_pos, lookahead = item
-                left, right = self.augmented_P[prod_num]
-                symbols = list(right)
-                
-                if dot_pos < len(symbols):
-                    next_symbol = symbols[dot_pos]
-                    goto_set = self.goto(itemset, next_symbol)
-                    
-                    if goto_set:
-                        goto_index = self.itemsets.index(goto_set)
-                        
-                        if next_symbol in self.T:
-                            action = f's{goto_index}'
-                            self.parsing_table[i][next_symbol] = action
-                        else:
-                            self.parsing_table[i][next_symbol] = str(goto_index)
-                else:
-                    if prod_num == 0 and lookahead == '$':
-                        self.parsing_table[i][lookahead] = 'acc'
-                    else:
-                        action = f'r{prod_num}'
-                        self.parsing_table[i][lookahead] = action
+    def profile_translation(self, input_string):
+        """translate_input on a ProfilingTranslator counting into self.stats"""
+        translator = ProfilingTranslator(self)
+        if not profile_run(translator, self.stats, input_string, 'translate'):
+            self.result = None
+            return None
+        self.result = translator.attr_stack[-1] if translator.attr_stack else None
+        if self.optimize_code:
+            self.intermediate_code, self.result = optimize(self.intermediate_code, self.result)
+        return tuple(self.intermediate_code)
     
-    def translate_input(self, input_string):
-        """Translate input string to intermediate code"""
+    def run_translation(self, input_string):
+        """translate_input without the result cache"""
         self.temp_counter = 0
+        self.identifier_counter = 0
         self.intermediate_code = []
         
         stack = [0] 
         attr_stack = []
-        input_list = list(input_string) + ['$']
-        position = 0
+        tokens = self.lexer.tokens(input_string) # (terminal_id, lexeme, offset)
+        terminal_id, lexeme, offset = next(tokens)
         
-        identifier_counter = 0
+        table = self.compiled_table
+        action_base, action_next, action_check = table.action_base, table.action_next, table.action_check
+        goto_base, goto_next = table.goto_base, table.goto_next
+        prod_len, prod_lhs = table.prod_len, table.prod_lhs
+        reduce_actions = self.reduce_actions
+        terminal_actions = self.terminal_actions
+        next_token = tokens.__next__
         
-        step = 0
-        while True:
+        while True: # ends on ACCEPT or ERROR
             current_state = stack[-1]
-            current_input = input_list[position] # ['a','+','a','*','a','$']
             
-            action = self.parsing_table[current_state].get(current_input, '') # rX sau sX
+            action = 0 # sX > 0, rX < ACCEPT
+            if terminal_id >= 0:
+                i = action_base[current_state] + terminal_id
+                if action_check[i] == current_state:
+                    action = action_next[i]
             
             if not action:
+                self.result = None
                 return None
             
-            if action == 'acc':
-                return self.intermediate_code
+            if action == ACCEPT:
+                self.result = attr_stack[-1] if attr_stack else None
+                if self.optimize_code:
+                    self.intermediate_code, self.result = optimize(self.intermediate_code, self.result)
+                return tuple(self.intermediate_code)
             
-            elif action.startswith('s'): 
-                next_state = int(action[1:])
+            elif action > 0: 
+                next_state = action
                 stack.append(next_state)
                 
-                if current_input == 'a':
-                    identifier_counter += 1
-                    identifier = f"a{identifier_counter}"
-                    attr_stack.append(identifier)
+                terminal_action = terminal_actions[terminal_id]
+                if terminal_action is not None:
+                    terminal_action(attr_stack, lexeme)
                 
-                position += 1
+                terminal_id, lexeme, offset = next_token()
             
-            elif action.startswith('r'):
-                prod_num = int(action[1:])
-                left, right = self.P[prod_num]
-                rhs_length = len(right)
-                
-                stack = stack[:-rhs_length] #pop
-                
-                if prod_num == 1:  # E -> E + T
-                    t_val = attr_stack.pop()
-                    e1_val = attr_stack.pop()
-                    e_val = self.newtemp()
-                    self.emit(f"{e_val} := {e1_val} + {t_val}")
-                    attr_stack.append(e_val)
-                
-                elif prod_num == 11:  # E -> E - T
-                    t_val = attr_stack.pop()
-                    e1_val = attr_stack.pop()
-                    e_val = self.newtemp()
-                    self.emit(f"{e_val} := {e1_val} - {t_val}")
-                    attr_stack.append(e_val)
-                
-                elif prod_num == 2:  # E -> T
-                    pass
-                
-                elif prod_num == 3:  # T -> T * F
-                    f_val = attr_stack.pop()
-                    t1_val = attr_stack.pop()
-                    t_val = self.newtemp()
-                    self.emit(f"{t_val} := {t1_val} * {f_val}")
-                    attr_stack.append(t_val)
-                
-                elif prod_num == 31:  # T -> T / F
-                    f_val = attr_stack.pop()
-                    t1_val = attr_stack.pop()
-                    t_val = self.newtemp()
-                    self.emit(f"{t_val} := {t1_val} / {f_val}")
-                    attr_stack.append(t_val)
-                
-                elif prod_num == 4:  # T -> F
-                    pass
-                
-                elif prod_num == 5:  # F -> (E)
-                    # Remove '(' ')'
-                    e_val = attr_stack.pop()
-                    attr_stack.append(e_val)  # F.p = E.p
+            else:
+                prod_id = -action - 1 # decode_reduce(action)
+                rhs_length = prod_len[prod_id]
                 
-                elif prod_num == 6:  # F -> a
-                    pass
+                if rhs_length:
+                    del stack[-rhs_length:] #pop in place
                 
-                elif prod_num == 51:  # F -> -(E)
-                    e_val = attr_stack.pop()
-                    f_val = self.newtemp()
-                    self.emit(f"{f_val} := uminus {e_val}")
-                    attr_stack.append(f_val)
+                reduce_action = reduce_actions[prod_id]
+                if reduce_action is not None:
+                    reduce_action(attr_stack)
                 
-                goto_state = int(self.parsing_table[stack[-1]][left])
+                goto_state = goto_next[goto_base[stack[-1]] + prod_lhs[prod_id]]
                 stack.append(goto_state)
-            
-            step += 1
-            if step > 100:
-                return None
+
+class LR1PushTranslator(PushParser):
+    """Translates a stream chunk by chunk; take_code() drains the code emitted so far
+    
+    Uses the temporaries and code list of its LR1Translator, so only one stream
+    (or translate_input call) can be active per translator at a time. The code
+    is never optimized, as it is handed out before the whole block is known.
+    """
+    
+    def __init__(self, translator):
+        super().__init__(translator.compiled_table, translator.lexer)
+        self.translator = translator
+        self.attr_stack = []
+        translator.temp_counter = 0
+        translator.identifier_counter = 0
+        translator.intermediate_code = []
+    
+    def on_shift(self, terminal_id, lexeme):
+        terminal_action = self.translator.terminal_actions[terminal_id]
+        if terminal_action is not None:
+            terminal_action(self.attr_stack, lexeme)
+    
+    def on_reduce(self, prod_id):
+        reduce_action = self.translator.reduce_actions[prod_id]
+        if reduce_action is not None:
+            reduce_action(self.attr_stack)
+    
+    def take_code(self):
+        """Three-address code emitted since the last call"""
+        code = self.translator.intermediate_code
+        self.translator.intermediate_code = []
+        return code
+
+
+class ProfilingTranslator(ProfilingMixin, LR1PushTranslator):
+    pass
 
 def main():
     
     translator = LR1Translator()
+    translator.number_identifiers = True
     
-    translator.compute_first_sets()
-    translator.build_canonical_collection()
-    translator.build_parsing_table()
+    if not translator.load_cached_table():
+        translator.compute_first_sets()
+        translator.build_canonical_collection()
+        translator.build_parsing_table()
+        translator.save_cached_table()
     
     test_inputs = [
         "a+a*a", 
@@ -0,0 +1,99 @@
+from ParseTable import CompiledTable, decode_reduce, encode_reduce
+
+
+def unit_productions(table, skip=None):
+    """Dense ids of the unit productions A -> X of table (not S' -> S); skip(prod_id) excludes more"""
+    return [prod_id for prod_id in range(1, len(table.prod_nums))
+            if table.prod_len[prod_id] == 1 and not (skip and skip(prod_id))]
+
+
+def bypass_unit_reductions(table, unit_prod_ids):
+    """Copy of a CompiledTable that never performs the reductions by the given unit productions
+
+    A reduction by A -> X pops the state entered on X and pushes GOTO(p, A) of
+    the state p below it, so the state q = GOTO(p, X) can be replaced by a state
+    acting like q where q shifts and like GOTO(p, A) (itself bypassed) where q
+    reduces by A -> X. Such merged states are created per entering context p,
+    which rewrites the shift and GOTO entries pointing at q. The accepted
+    language is unchanged, errors are still found before the next shift, and
+    productions with semantic actions must not be passed in, since their
+    reductions disappear. States no longer reachable are dropped.
+
+    The skipped reductions are kept in the new table's unit_chains:
+    (state, terminal id) -> dense ids of the unit productions the original
+    table would have reduced by, in order, before that entry's action. The
+    fast loops ignore them; tracers and EngineStats report them, so accepted
+    inputs show the same reductions as on the original table.
+    """
+    n_terminals, n_nonterminals = len(table.terminals), len(table.nonterminals)
+    actions = [{t: a for t in range(n_terminals) if (a := table.action(state, t))}
+               for state in range(table.n_states)]
+    gotos = [{nt: g for nt in range(n_nonterminals) if (g := table.goto(state, nt))}
+             for state in range(table.n_states)]
+    original_states = table.n_states
+    unit_lhs = {encode_reduce(prod_id): table.prod_lhs[prod_id] for prod_id in unit_prod_ids}
+    merged = {}  # (state, ((lhs, target), ...)) -> merged state
+    chains = {}  # (state, terminal id) -> bypassed unit production ids, for the states created here
+
+    def target(p, q, depth=0):
+        """State to push instead of q when entering q from p"""
+        lhs_ids = {unit_lhs[a] for a in actions[q].values() if a in unit_lhs} if q < original_states else None
+        if not lhs_ids or depth > n_nonterminals:  # nothing to bypass, or a unit cycle A -> B -> A
+            return q
+        targets = {}
+        for lhs in lhs_ids:
+            r = gotos[p].get(lhs)
+            if not r:
+                return q
+            targets[lhs] = target(p, r, depth + 1)
+        key = (q, tuple(sorted(targets.items())))
+        m = merged.get(key)
+        if m is None:
+            action_row = {}
+            row_chains = {}
+            for t, a in actions[q].items():
+                if a in unit_lhs:
+                    r = targets[unit_lhs[a]]
+                    prod_id = decode_reduce(a)
+                    a = actions[r].get(t)
+                    if a is None:
+                        continue
+                    row_chains[t] = (prod_id,) + chains.get((r, t), ())
+                action_row[t] = a
+            goto_row = dict(gotos[q])
+            for r in targets.values():
+                for nt, g in gotos[r].items():
+                    if goto_row.setdefault(nt, g) != g:
+                        return q  # q and GOTO(p, A) continue differently after nt: keep the reduction
+            m = merged[key] = len(actions)
+            chains.update(((m, t), chain) for t, chain in row_chains.items())
+            actions.append(action_row)
+            gotos.append(goto_row)
+            pending.append(m)
+        return m
+
+    pending = list(range(original_states))
+    while pending:
+        p = pending.pop()
+        for t, a in actions[p].items():
+            if a > 0:
+                actions[p][t] = target(p, a)
+        for nt, g in gotos[p].items():
+            gotos[p][nt] = target(p, g)
+
+    # Renumber the states reachable from state 0
+    number = {0: 0}
+    order = [0]
+    for state in order:
+        for next_state in [a for a in actions[state].values() if a > 0] + list(gotos[state].values()):
+            if next_state not in number:
+                number[next_state] = len(order)
+                order.append(next_state)
+    action_rows = [{t: number[a] if a > 0 else a for t, a in actions[state].items()} for state in order]
+    goto_rows = [{nt: number[g] for nt, g in gotos[state].items()} for state in order]
+
+    productions = [(prod_num, table.nonterminals[lhs] if lhs >= 0 else "S'", length)
+                   for prod_num, lhs, length in zip(table.prod_nums, table.prod_lhs, table.prod_len)]
+    compiled = CompiledTable(table.terminals, table.nonterminals, productions, action_rows, goto_rows, table.compressed)
+    compiled.unit_chains = {(number[state], t): chain for (state, t), chain in chains.items() if state in number}
+    return compiled
@@ -0,0 +1,159 @@
+import re
+from itertools import chain
+from operator import attrgetter
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency, only needed for batch recognition
+    np = None
+
+from ParseTable import ACCEPT
+
+CHUNK_CELLS = 1 << 20  # stack cells of one lockstep chunk: lanes x (longest input in tokens + 2)
+MIN_LANES = 16  # smaller chunks are left to the scalar recognizer
+SKIP = -2  # regex group of whitespace in batch_kinds
+
+
+def as_numpy(buffer):
+    """Zero-copy NumPy view of an array.array or memoryview table buffer"""
+    return np.frombuffer(buffer, dtype=buffer.typecode if hasattr(buffer, 'typecode') else buffer.format)
+
+
+def dense_tables(table):
+    """ACTION and GOTO of a CompiledTable as dense NumPy matrices
+
+    ACTION gets one extra all-error column that unknown characters are mapped to.
+    """
+    states = np.arange(table.n_states)[:, None]
+
+    def unpack(base, next_, check, width):
+        index = as_numpy(base).astype(np.int64)[:, None] + np.arange(width)
+        return np.where(as_numpy(check)[index] == states, as_numpy(next_)[index], 0).astype(np.int32)
+
+    action = unpack(table.action_base, table.action_next, table.action_check, len(table.terminals))
+    action = np.hstack([action, np.zeros((table.n_states, 1), dtype=np.int32)])
+    goto = unpack(table.goto_base, table.goto_next, table.goto_check, len(table.nonterminals))
+    return action, goto
+
+
+def batch_kinds(lexer, inputs):
+    """Terminal ids of all inputs from one regex pass over their '\\0'-joined text
+
+    Returns (ids, starts, lengths): ids is the flat int32 array of every input's
+    terminal ids including its closing '$', starts and lengths locate each input
+    in it. Inputs that contain '\\0', or a token pattern that matches across it,
+    are lexed one by one instead.
+    """
+    n_inputs = len(inputs)
+    regex = re.compile('(\0)|' + lexer.regex.pattern, re.DOTALL)  # group 1: end of an input
+    # regex group -> terminal id, SKIP for whitespace
+    group_ids = np.array([SKIP, lexer.end_id] + [SKIP if kind is None else kind for kind in lexer.group_kinds[1:]],
+                         dtype=np.int32)
+    groups = np.fromiter(map(attrgetter('lastindex'), regex.finditer('\0'.join(inputs) + '\0')), dtype=np.int32)
+    ids = group_ids[groups]
+    ids = ids[ids != SKIP]
+    ends = np.flatnonzero(ids == lexer.end_id)
+    if ends.size != n_inputs:
+        rows = [lexer.kinds(text) for text in inputs]
+        ids = np.fromiter(chain.from_iterable(rows), dtype=np.int32)
+        ends = np.cumsum(np.fromiter(map(len, rows), dtype=np.int64, count=n_inputs)) - 1
+    lengths = np.diff(ends, prepend=-1)
+    return ids, ends - lengths + 1, lengths
+
+
+def chunk_bounds(lengths, cells):
+    """Split lanes sorted by length into [start, end) chunks of at most `cells` stack cells each"""
+    n_lanes = lengths.size
+    start = 0
+    while start < n_lanes:
+        # Largest end with (end - start) * (lengths[end - 1] + 2) <= cells, at least one lane
+        low, high = start + 1, n_lanes
+        while low < high:
+            middle = (low + high + 1) // 2
+            if (middle - start) * (int(lengths[middle - 1]) + 2) <= cells:
+                low = middle
+            else:
+                high = middle - 1
+        yield start, low
+        start = low
+
+
+def recognize_batch(table, lexer, inputs, recognize=None, chunk_cells=CHUNK_CELLS):
+    """Accept/reject many inputs at once by advancing their LR stacks in lockstep
+
+    All inputs are tokenized by one regex pass (see batch_kinds). Inputs are
+    then sorted by token count and run in chunks of similar length, each with
+    a stack matrix of about chunk_cells cells, so one long input does not pad
+    every short one. Every step looks up ACTION for all unfinished inputs
+    (lanes) of a chunk with one fancy index and applies their shifts and
+    reductions with masked array updates. Chunks of fewer than MIN_LANES long
+    inputs go to recognize(text), the scalar recognizer, when one is given,
+    since per-step NumPy overhead would dominate. Returns a NumPy bool array
+    with one verdict per input.
+    """
+    if np is None:
+        raise ImportError("recognize_batch requires NumPy")
+
+    n_lanes = len(inputs)
+    result = np.zeros(n_lanes, dtype=bool)
+    if not n_lanes:
+        return result
+
+    action, goto = dense_tables(table)
+    n_columns, n_nonterminals = action.shape[1], goto.shape[1]
+    action, goto = action.ravel(), goto.ravel()
+    prod_len = as_numpy(table.prod_len).astype(np.int64)
+    prod_lhs = as_numpy(table.prod_lhs).astype(np.int64)
+    epsilon = bool((prod_len == 0).any())  # stacks can outgrow the input only with epsilon reductions
+
+    ids, starts, lengths = batch_kinds(lexer, inputs)
+    ids[ids < 0] = n_columns - 1  # unknown characters get the all-error column
+
+    order = np.argsort(lengths, kind='stable')
+    sorted_lengths = lengths[order]
+    for chunk_start, chunk_end in chunk_bounds(sorted_lengths, chunk_cells):
+        lanes = order[chunk_start:chunk_end]
+        n_chunk = lanes.size
+        if recognize is not None and n_chunk < MIN_LANES:
+            for lane in lanes.tolist():
+                result[lane] = recognize(inputs[lane])
+            continue
+        depth = int(sorted_lengths[chunk_end - 1]) + 2
+        stack = np.zeros(n_chunk * depth, dtype=np.int32)  # row k holds the stack of the chunk's k-th lane
+        bottom = np.arange(n_chunk, dtype=np.int64) * depth  # stack index of state 0 per lane
+        top = bottom.copy()  # stack index of the top per lane
+        state = np.zeros(n_chunk, dtype=np.int64)  # state on top per lane
+        cursor = starts[lanes]  # index of the lane's current token in ids
+
+        while lanes.size:
+            acts = action[state * n_columns + ids[cursor]]
+            shift = acts > 0
+            if not shift.all():
+                # Accepted and failed lanes leave the chunk
+                done = (acts == 0) | (acts == ACCEPT)
+                if done.any():
+                    result[lanes[acts == ACCEPT]] = True
+                    keep = ~done
+                    lanes, bottom, top, state, cursor = lanes[keep], bottom[keep], top[keep], state[keep], cursor[keep]
+                    acts, shift = acts[keep], shift[keep]
+                    if not lanes.size:
+                        break
+
+            if epsilon and int((top - bottom).max()) + 1 >= depth:
+                grown = np.zeros((n_chunk, 2 * depth), dtype=np.int32)
+                grown[:, :depth] = stack.reshape(n_chunk, depth)
+                stack = grown.ravel()
+                top += bottom  # bottom // depth * 2 * depth + (top - bottom)
+                bottom *= 2
+                depth *= 2
+
+            # Shifts push the new state; reductions pop the right side and push GOTO. Shifting
+            # lanes compute a dummy reduction by production 0, whose result is discarded.
+            prod_ids = np.where(shift, 0, -1 - acts)
+            below = top - prod_len[prod_ids]
+            state = np.where(shift, acts, goto[stack[below] * n_nonterminals + prod_lhs[prod_ids]])
+            top = np.where(shift, top + 1, below + 1)
+            stack[top] = state
+            cursor = cursor + shift
+
+    return result